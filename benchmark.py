@@ -0,0 +1,269 @@
+"""
+Benchmarks of the data processing pipeline of smartcam_analysis.
+
+Usage:
+    python benchmark.py parse data/simulations_*.txt
+    python benchmark.py generate DIR --seeds 2 --rows 601 --jitter 0.01
+    python benchmark.py compression --seeds 1 --rows 2001
+    python benchmark.py suite --scales 1 2 4 --output benchmark.json [--compare previous.json]
+"""
+import argparse
+import datetime
+import gzip
+import json
+import lzma
+import os
+import platform
+import tarfile
+import tempfile
+import time
+
+import numpy as np
+
+from smartcam_analysis import cli
+from smartcam_analysis.charts import chartFamilies, renderCharts
+from smartcam_analysis.ingest import (archiveMembers, convert, extractCoordinates, extractVariableNames, ingestFiles, memberSeparator, openCsv,
+                                      readExport, resample, zstandard)
+from smartcam_analysis.reduce import StreamingSummary, reduceDataset
+from smartcam_analysis.storage import spliceExports
+from smartcam_analysis.synthetic import generateExports
+
+def timeit(fun, repeat):
+    """
+    Runs fun repeat times, returns the best wall time in seconds.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fun()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def legacyParse(files):
+    return [(extractCoordinates(f), extractVariableNames(f), np.matrix(openCsv(f))) for f in files]
+
+def bulkParse(files):
+    return [readExport(f) for f in files]
+
+def benchmarkParsing(files, repeat=3):
+    """
+    Compares the three-function parsing path against readExport().
+
+    Returns
+    -------
+    dict
+        Best wall time of each parser, in seconds
+    """
+    return {
+        'openCsv+extractCoordinates+extractVariableNames': timeit(lambda: legacyParse(files), repeat),
+        'readExport': timeit(lambda: bulkParse(files), repeat),
+    }
+
+def compressFiles(files, directory):
+    """
+    Writes each export compressed with every available format, and all of
+    them in tar archives.
+
+    Returns
+    -------
+    dict
+        format: the paths to read, as readExport() takes them
+    """
+    compressors = {'gz': gzip.open, 'xz': lzma.open}
+    if zstandard is not None:
+        compressors['zst'] = lambda path, mode: zstandard.ZstdCompressor().stream_writer(open(path, mode))
+    formats = {'txt': files}
+    for suffix, compress in compressors.items():
+        formats[suffix] = []
+        for path in files:
+            formats[suffix].append(os.path.join(directory, os.path.basename(path) + '.' + suffix))
+            with open(path, 'rb') as source, compress(formats[suffix][-1], 'wb') as target:
+                target.write(source.read())
+    for mode in ('gz', 'xz'):
+        archive = os.path.join(directory, 'exports.tar.' + mode)
+        with tarfile.open(archive, 'w:' + mode) as tar:
+            for path in files:
+                tar.add(path, os.path.basename(path))
+        formats['tar.' + mode] = [archive + memberSeparator + member for member in archiveMembers(archive)]
+    return formats
+
+def benchmarkCompression(files, repeat=3):
+    """
+    Times the reading of the same exports stored plain, compressed and in tar
+    archives. The files are in the page cache, so the timings are the cost of
+    decompressing and parsing: reading compressed files is faster whenever the
+    storage delivers less than breakEvenMBps, the bytes it saves divided by
+    the time the decompression costs.
+
+    Returns
+    -------
+    dict
+        format: bytes on disk, best wall time and break-even bandwidth
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, paths in compressFiles(files, directory).items():
+            archives = set(path.split(memberSeparator)[0] for path in paths)
+            results[name] = {'bytes': sum(os.path.getsize(path) for path in archives), 'seconds': timeit(lambda: bulkParse(paths), repeat)}
+    plain = results.pop('txt')
+    for result in results.values():
+        extra = result['seconds'] - plain['seconds']
+        result['breakEvenMBps'] = (plain['bytes'] - result['bytes']) / extra / 1e6 if extra > 0 else float('inf')
+    return dict(txt=plain, **results)
+
+def benchmarkPipeline(files, timeline, families=chartFamilies, workers=1, repeat=1, legacy=True):
+    """
+    Times each stage of the pipeline on some exports, with the settings of the
+    command line.
+
+    Parameters
+    ----------
+    files : list of str
+        the exports
+    timeline : ndarray
+        the timeline to resample onto
+    families : list of str
+        the chart families to draw, none to skip the charts
+    workers : int
+        processes reading the exports and drawing the charts
+    repeat : int
+        repetitions of each stage, the best one is reported
+    legacy : bool
+        also time openCsv() and convert(), much slower than the rest
+
+    Returns
+    -------
+    dict
+        Best wall time of each stage, in seconds
+
+    """
+    if legacy:
+        timings = benchmarkParsing(files, repeat)
+    else:
+        timings = {'readExport': timeit(lambda: bulkParse(files), repeat)}
+    parsed = bulkParse(files)
+    if legacy:
+        matrices = [np.matrix(export.data) for export in parsed]
+        timings['convert'] = timeit(lambda: [convert(0, timeline, m) for m in matrices], repeat)
+        del matrices
+    timings['resample'] = timeit(lambda: [resample(0, timeline, export.data) for export in parsed], repeat)
+    del parsed
+    timings['ingestFiles'] = timeit(lambda: ingestFiles(files, cli.timeColumnName, timeline, cli.resampleMode, workers), repeat)
+    exports = ingestFiles(files, cli.timeColumnName, timeline, cli.resampleMode, workers)
+    timings['spliceExports'] = timeit(lambda: spliceExports(None, exports, cli.timeColumnName, timeline, (), cli.storageDtypes), repeat)
+    dataset = spliceExports(None, exports, cli.timeColumnName, timeline, (), cli.storageDtypes)
+    timings['reduceDataset'] = timeit(lambda: reduceDataset(dataset, cli.seedVars, cli.timeColumnName, cli.sumRatios), repeat)
+    def streaming():
+        summary = StreamingSummary(cli.seedVars, cli.timeColumnName, timeline, cli.sumRatios)
+        for export in exports:
+            summary.add(export)
+        return summary.reductions()
+    timings['StreamingSummary'] = timeit(streaming, repeat)
+    if families:
+        reduced = reduceDataset(dataset, cli.seedVars, cli.timeColumnName, cli.sumRatios)
+        with tempfile.TemporaryDirectory() as chartsDir:
+            jobs = cli.chartJobs(reduced, families, chartsDir + '/')
+            timings['renderCharts'] = timeit(lambda: renderCharts(jobs, workers), repeat)
+    return timings
+
+def benchmarkSuite(scales, rows, step=1.0, jitter=0.01, families=chartFamilies, workers=1, repeat=1, legacy=True):
+    """
+    Runs benchmarkPipeline() on synthetic exports of the grid of the
+    simulations, with more and more seeds.
+
+    Parameters
+    ----------
+    scales : list of int
+        the numbers of seeds to try
+    rows, step, jitter : see smartcam_analysis.synthetic.syntheticData()
+    families, workers, repeat, legacy : see benchmarkPipeline()
+
+    Returns
+    -------
+    dict
+        The machine, the settings and, for each scale, its size and timings,
+        ready to be saved as JSON
+
+    """
+    timeline = np.linspace(cli.minTime, cli.maxTime, cli.timeSamples)
+    results = {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'machine': {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'settings': {'rows': rows, 'step': step, 'jitter': jitter, 'charts': list(families), 'workers': workers, 'repeat': repeat, 'legacy': legacy},
+        'scales': [],
+    }
+    for seeds in scales:
+        with tempfile.TemporaryDirectory() as directory:
+            files = generateExports(directory, seeds, rows, step, jitter)
+            size = sum(os.path.getsize(f) for f in files)
+            timings = benchmarkPipeline(files, timeline, families, workers, repeat, legacy)
+        results['scales'].append({'seeds': seeds, 'files': len(files), 'rows': len(files) * rows, 'bytes': size, 'seconds': timings})
+        print(formatScale(results['scales'][-1]))
+    return results
+
+def formatScale(scale, previous=None):
+    """
+    Formats the timings of a scale, with the ratio to a previous run if given.
+    """
+    lines = ['{} seeds, {} files, {:.1f} MB'.format(scale['seeds'], scale['files'], scale['bytes'] / 1e6)]
+    for stage, seconds in scale['seconds'].items():
+        line = '  {:<50} {:8.3f}s {:10.1f} files/s'.format(stage, seconds, scale['files'] / seconds)
+        if previous is not None and stage in previous['seconds']:
+            line += '  x{:.2f}'.format(seconds / previous['seconds'][stage])
+        lines.append(line)
+    return '\n'.join(lines)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0], formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog='\n'.join(__doc__.strip().splitlines()[2:]))
+    commands = parser.add_subparsers(dest='command', required=True)
+    parse = commands.add_parser('parse', help='compare the parsers on some exports')
+    parse.add_argument('files', nargs='+', help='Alchemist export files to parse')
+    parse.add_argument('--repeat', type=int, default=3, help='repetitions, the best one is reported')
+    generate = commands.add_parser('generate', help='write synthetic exports on the grid of the simulations')
+    generate.add_argument('directory', help='destination directory')
+    generate.add_argument('--seeds', type=int, default=1, help='number of seeds (default: 1)')
+    compression = commands.add_parser('compression', help='compare the reading of plain, compressed and archived synthetic exports')
+    compression.add_argument('--seeds', type=int, default=1, help='number of seeds (default: 1)')
+    compression.add_argument('--repeat', type=int, default=3, help='repetitions, the best one is reported')
+    suite = commands.add_parser('suite', help='time every stage on synthetic exports of growing size')
+    suite.add_argument('--scales', type=int, nargs='+', default=[1, 2, 4], metavar='SEEDS', help='numbers of seeds to try (default: 1 2 4)')
+    suite.add_argument('--charts', nargs='*', choices=chartFamilies, default=chartFamilies, metavar='FAMILY',
+                       help='chart families to draw, none to skip them (default: all)')
+    suite.add_argument('--workers', type=int, default=1, metavar='N', help='processes reading the exports and drawing the charts')
+    suite.add_argument('--repeat', type=int, default=1, help='repetitions, the best one is reported')
+    suite.add_argument('--no-legacy', dest='legacy', action='store_false', help='do not time openCsv() and convert()')
+    suite.add_argument('--output', default='benchmark.json', help='where to save the results (default: benchmark.json)')
+    suite.add_argument('--compare', metavar='JSON', help='results of a previous suite, to print the ratio of each timing')
+    for command in (generate, compression, suite):
+        command.add_argument('--rows', type=int, default=601, help='rows of each export (default: 601)')
+        command.add_argument('--step', type=float, default=1.0, help='mean time between two rows (default: 1)')
+        command.add_argument('--jitter', type=float, default=0.01, help='maximum deviation from the regular sampling (default: 0.01)')
+    args = parser.parse_args()
+    if args.command == 'parse':
+        results = benchmarkParsing(args.files, args.repeat)
+        for name, seconds in results.items():
+            print('{:<50} {:8.3f}s {:10.1f} files/s'.format(name, seconds, len(args.files) / seconds))
+    elif args.command == 'compression':
+        with tempfile.TemporaryDirectory() as directory:
+            files = generateExports(directory, args.seeds, args.rows, args.step, args.jitter)
+            results = benchmarkCompression(files, args.repeat)
+        for name, result in results.items():
+            line = '{:<8} {:8.1f} MB {:8.3f}s {:10.1f} files/s {:8.1f} MB/s of text'.format(
+                name, result['bytes'] / 1e6, result['seconds'], len(files) / result['seconds'], results['txt']['bytes'] / result['seconds'] / 1e6)
+            if 'breakEvenMBps' in result:
+                line += ', faster than plain text below {:.0f} MB/s of storage'.format(result['breakEvenMBps'])
+            print(line)
+    elif args.command == 'generate':
+        files = generateExports(args.directory, args.seeds, args.rows, args.step, args.jitter)
+        print(str(len(files)) + ' exports written to ' + args.directory)
+    else:
+        results = benchmarkSuite(args.scales, args.rows, args.step, args.jitter, args.charts, args.workers, args.repeat, args.legacy)
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+        if args.compare:
+            with open(args.compare) as file:
+                previous = {scale['seeds']: scale for scale in json.load(file)['scales']}
+            print('compared to ' + args.compare + ':')
+            for scale in results['scales']:
+                print(formatScale(scale, previous.get(scale['seeds'])))
@@ -0,0 +1,15 @@
+"""
+Analysis of the Alchemist exports of the SmartCam simulations, in stages that
+can be used on their own:
+
+- ingest: parsing and resampling of the exports
+- reduce: summaries of the experiments over seeds and time
+- storage: saved datasets, summaries and caches
+- catalog: index of the headers of the exports, to select them without reading them
+- charts: drawing of the charts
+
+xarray and the plotting libraries are imported only by the functions using
+them, so checking whether something changed does not pay for them.
+
+The command line is in cli, run it with python -m smartcam_analysis.
+"""
@@ -0,0 +1,168 @@
+"""
+Persistent index of the exports: what is in each file, read once and kept in
+SQLite, so that finding the files of some combinations of the experiment
+variables does not open them.
+"""
+import json
+import math
+import os
+import sqlite3
+from collections import namedtuple
+from functools import partial
+
+from .ingest import iterArchive, mapFiles, memberSeparator, scanExport, scanHeader, scanStream
+from .storage import fileSignature
+
+CatalogEntry = namedtuple('CatalogEntry', ['path', 'signature', 'coordinates', 'rows', 'first', 'last'])
+CatalogEntry.__doc__ = """
+A file of the catalog: its signature (see fileSignature()), the coordinates
+in its header, its number of rows and its first and last time. The header is
+all that is read to catalog a file, so the number of rows is None until a
+stage reads the values (see Catalog.count()), and the last time is NaN for
+compressed files and archive members until their span is asked for.
+"""
+
+class Catalog:
+    """
+    The exports of each experiment, with their coordinates, number of rows and
+    time span. Only the files that changed since they were scanned are opened
+    again, and only their headers are read.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters
+        ----------
+        path : str
+            the SQLite database, created if missing
+
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS exports (path TEXT PRIMARY KEY, experiment TEXT, signature TEXT, '
+                                'coordinates TEXT, rows INTEGER, first REAL, last REAL)')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS archives (path TEXT PRIMARY KEY, signature TEXT, members TEXT)')
+        # Headers of the members read while listing their archive, used by update()
+        self.scanned = {}
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def members(self, path, timeColumnName='time'):
+        """
+        The members of a tar archive, in their order, listed again only if
+        the archive changed. The headers of the members are read in the same
+        pass, so that update() does not go through the archive again.
+        """
+        signature = json.dumps(fileSignature(path))
+        row = self.connection.execute('SELECT signature, members FROM archives WHERE path = ?', (path,)).fetchone()
+        if row is not None and row[0] == signature:
+            return json.loads(row[1])
+        members = []
+        for name, content in iterArchive(path):
+            members.append(name)
+            try:
+                coordinates, names, first = scanStream(content, timeColumnName)
+            except ValueError:
+                continue # not an export, it is not going to be asked for
+            self.scanned[path + memberSeparator + name] = (coordinates, 0 if first is None else None,
+                                                           float('nan') if first is None else first, float('nan'))
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO archives VALUES (?, ?, ?)', (path, signature, json.dumps(members)))
+        return members
+
+    def update(self, experiment, files, timeColumnName='time', contentHash=False, workers=1, spans=False):
+        """
+        Scans the headers of the files of an experiment that are new or
+        changed, and forgets the ones that do not exist anymore.
+
+        Parameters
+        ----------
+        experiment : str
+            the experiment
+        files : list of str
+            all the files of the experiment
+        timeColumnName : str
+            name of the time column
+        contentHash : bool
+            see fileSignature()
+        workers : int
+            processes scanning the files, see mapFiles()
+        spans : bool
+            also read in full the files whose time span the header does not
+            give (see CatalogEntry), once
+
+        Returns
+        -------
+        list of CatalogEntry
+            The entries of the files, in the same order
+
+        """
+        known = {entry.path: entry for entry in self.entries(experiment)}
+        signatures = {file: fileSignature(file, contentHash) for file in files}
+        changed = [file for file in files if file not in known or known[file].signature != signatures[file]]
+        unlisted = [file for file in changed if file not in self.scanned]
+        scans = dict(zip(unlisted, mapFiles(partial(scanHeader, timeColumnName=timeColumnName), unlisted, workers)))
+        scans.update({file: self.scanned.pop(file) for file in changed if file not in scans})
+        if spans:
+            # the empty exports have no span, counting the rows of the others does not give it
+            unknown = [file for file in files if file not in scans and known[file].rows != 0 and math.isnan(known[file].last)]
+            unknown += [file for file, (coordinates, rows, first, last) in scans.items() if rows != 0 and math.isnan(last)]
+            scans.update(zip(unknown, mapFiles(partial(scanExport, timeColumnName=timeColumnName), unknown, workers)))
+            changed = list(dict.fromkeys(changed + unknown))
+        with self.connection:
+            self.connection.executemany('DELETE FROM exports WHERE path = ?', [(path,) for path in known if path not in signatures])
+            for file in changed:
+                coordinates, rows, first, last = scans[file]
+                known[file] = CatalogEntry(file, signatures[file], coordinates, rows, first, last)
+                self.connection.execute('INSERT OR REPLACE INTO exports VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                        (file, experiment, json.dumps(signatures[file]), json.dumps(coordinates), rows, first, last))
+        return [known[file] for file in files]
+
+    def count(self, rows):
+        """
+        Records the number of rows of exports, counted by a stage that read
+        their values.
+
+        Parameters
+        ----------
+        rows : dict
+            path of the export: number of rows
+        """
+        with self.connection:
+            self.connection.executemany('UPDATE exports SET rows = ? WHERE path = ?', [(count, path) for path, count in rows.items()])
+
+    def entries(self, experiment, **selection):
+        """
+        The files of an experiment whose coordinates match a selection.
+
+        Parameters
+        ----------
+        experiment : str
+            the experiment
+        selection : dict
+            variable: value, or variable: list of values, as in
+            entries('simulations', Algorithm=['ff_linpro'], CommunicationRange=100)
+
+        Returns
+        -------
+        list of CatalogEntry
+            The matching entries, sorted by path
+
+        """
+        selection = {k: v if isinstance(v, (list, tuple, set)) else [v] for k, v in selection.items()}
+        rows = self.connection.execute('SELECT path, signature, coordinates, rows, first, last FROM exports '
+                                       'WHERE experiment = ? ORDER BY path', (experiment,))
+        entries = []
+        for path, signature, coordinates, count, first, last in rows:
+            coordinates = json.loads(coordinates)
+            if all(coordinates.get(k) in values for k, values in selection.items()):
+                entries.append(CatalogEntry(path, tuple(json.loads(signature)), coordinates, count,
+                                            float('nan') if first is None else first, float('nan') if last is None else last))
+        return entries
@@ -0,0 +1,533 @@
+"""
+The charts, each one drawn by a function taking plain arrays, so that they
+can be drawn in parallel. Plotting libraries are imported only when drawing.
+"""
+import hashlib
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from math import ceil, sqrt
+
+import numpy as np
+
+chartFamilies = ('3d', 'intime', 'heatmap', 'lines', 'latex', 'bars', 'movefficiency')
+rasterDpi = 200 # resolution of the rasterized artists in vector formats
+
+chartStyle = {'axes.titlesize': 13, 'axes.labelsize': 12} # shared by all the charts
+
+def setupCharts():
+    """
+    Selects the headless Agg backend and the style shared by all the charts,
+    in the processes of the pool that draws them.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    matplotlib.rcParams.update(chartStyle)
+
+def newFigure(**kwargs):
+    """
+    A figure with its own Agg canvas, outside of pyplot: drawing it does not
+    depend on the backend selected by the process, nor change it.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    figure = Figure(**kwargs)
+    FigureCanvasAgg(figure)
+    return figure
+
+def chartSources(function):
+    """
+    The source of a drawing function and of the functions of its module it
+    uses, recursively, and the values of the settings of the module they read.
+
+    Returns
+    -------
+    list of (str, str)
+        name and source, or repr of the value, sorted by name
+    """
+    import inspect
+    sources = {}
+    pending = [function]
+    while pending:
+        current = pending.pop()
+        sources[current.__name__] = inspect.getsource(current)
+        codes, names = [current.__code__], set()
+        while codes:
+            code = codes.pop()
+            names.update(code.co_names)
+            # the lambdas and the comprehensions
+            codes += [constant for constant in code.co_consts if inspect.iscode(constant)]
+        for name in names - set(sources):
+            value = current.__globals__.get(name)
+            if inspect.isfunction(value) and value.__module__ == current.__module__:
+                pending.append(value)
+            elif isinstance(value, (bool, int, float, str, tuple, list, dict)):
+                sources[name] = repr(value)
+    return sorted(sources.items())
+
+def chartFingerprint(function, kwargs):
+    """
+    Identifies what a chart job would draw: the source of its drawing function
+    and of the helpers it uses (see chartSources()), the shared style, and its
+    arguments, arrays included.
+
+    Returns
+    -------
+    str
+        SHA-1 of all of the above
+    """
+    import inspect
+    content = (chartStyle, chartSources(function), sorted(kwargs.items()))
+    return hashlib.sha1(pickle.dumps(content, protocol=4)).hexdigest()
+
+def renderCharts(jobs, workers=1, fingerprints=None):
+    """
+    Runs chart jobs, each one drawing a file from the small arrays it is given.
+
+    Parameters
+    ----------
+    jobs : list of (function, dict)
+        a drawing function defined in this module, and its keyword arguments
+    workers : int
+        number of processes drawing the charts, 0 uses all the cores, 1 draws
+        them in this process
+    fingerprints : dict
+        path: chartFingerprint() of the charts drawn before, the jobs whose file
+        exists with the same fingerprint are skipped. Updated with the charts
+        drawn. None draws all the charts
+
+    Returns
+    -------
+    list
+        The paths written by the jobs that were not skipped, in the order of jobs
+
+    """
+    if fingerprints is not None:
+        prints = [chartFingerprint(function, kwargs) for function, kwargs in jobs]
+        stale = [i for i, (function, kwargs) in enumerate(jobs)
+                 if fingerprints.get(kwargs['path']) != prints[i] or not os.path.exists(kwargs['path'])]
+        jobs = [jobs[i] for i in stale]
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if not jobs:
+        paths = []
+    elif workers <= 1 or len(jobs) == 1:
+        import matplotlib
+        # the style only while drawing, the backend of this process is left alone
+        with matplotlib.rc_context(chartStyle):
+            paths = [function(**kwargs) for function, kwargs in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=setupCharts) as pool:
+            futures = [pool.submit(function, **kwargs) for function, kwargs in jobs]
+            paths = [future.result() for future in futures]
+    if fingerprints is not None:
+        fingerprints.update((path, prints[i]) for i, path in zip(stale, paths))
+    return paths
+
+def noOdds(lst): # replaces odds numbers in lst with empty strings
+    return list(map(lambda x: x if round(x * 10, 0) % 2 == 0 else '', lst))
+
+def getSurfData(values, xs, ys):
+    """
+    Flattens a grid of values, indexed by xs and ys, into the x, y and z arrays
+    taken by plot_trisurf().
+    """
+    x, y = np.meshgrid(xs, ys, indexing='ij')
+    return x.ravel(), y.ravel(), np.asarray(values, dtype=float).ravel()
+
+def plotKcov3D(path, algos, commRanges, simRatios, surfaces, labels, colors, rasterized=False):
+    """
+    Draws the surfaces of k-coverage over communication range and ratio, one
+    subplot per algorithm.
+
+    Parameters
+    ----------
+    path : str
+        the destination file
+    algos : list of str
+        the algorithms, one subplot each
+    commRanges : list of float
+        the communication ranges, first axis of the surfaces
+    simRatios : list of float
+        the camera/object ratios, second axis of the surfaces
+    surfaces : list of list of ndarray
+        for each algorithm, the surface of each k-coverage drawn
+    labels, colors : list of str
+        legend and color of each k-coverage drawn
+    rasterized : bool
+        draw the surfaces as images, smaller and faster to render in vector
+        formats
+
+    """
+    import matplotlib
+    from mpl_toolkits.mplot3d import Axes3D # needed for 3d projection
+    fig = newFigure(figsize=(12,16))
+    for idx, algo in enumerate(algos):
+        cols = 2
+        rows = ceil(len(algos) / 2)
+        ax = fig.add_subplot(rows,cols,idx+1, projection='3d')
+        ax.set_xlabel("r")
+        ax.set_ylabel("n/m")
+        if idx%cols == cols-1:
+            ax.set_zlabel("Coverage (%)")
+        ax.set_xlim([max(commRanges),min(commRanges)])
+        ax.set_ylim([min(simRatios),max(simRatios)])
+        ax.set_zlim([0,1])
+        ax.set_title(algo)
+        fakeLinesForLegend = []
+        for k, surface in enumerate(surfaces[idx]):
+            x,y,z = getSurfData(surface, commRanges, simRatios)
+            ax.plot_trisurf(x,y,z, linewidth=2, antialiased=False, shade=True, alpha=0.5, color=colors[k], rasterized=rasterized)
+            fakeLinesForLegend.append(matplotlib.lines.Line2D([0],[0], linestyle='none', c=colors[k], marker='o'))
+        if idx == cols-1:
+            ax.legend(fakeLinesForLegend, labels, numpoints=1)
+    fig.tight_layout()
+    fig.savefig(path, dpi=rasterDpi if rasterized else 'figure')
+    return path
+
+def plotKcovInTime(path, kcov, ratios, times, values, algos):
+    """
+    Draws a k-coverage in time, one subplot per camera/object ratio and one
+    line per algorithm.
+
+    Parameters
+    ----------
+    path : str
+        the destination file
+    kcov : str
+        name of the k-coverage
+    ratios : list of str
+        the ratios, one subplot each
+    times : ndarray
+        the instants drawn
+    values : list of ndarray
+        for each ratio, the values with shape (time, algorithm)
+    algos : list of str
+        the algorithms, one line each
+
+    """
+    rows = 2
+    cols = 2
+    fig = newFigure(figsize=(8,5))
+    axes = fig.subplots(rows, cols, sharex='col', sharey='row')
+    for idx, whichRatio in enumerate(ratios):
+        r = int(idx / cols)
+        c = int(idx % cols)
+        axes[r][c].plot(times, values[idx])
+        axes[r][c].set_title('n/m = ' + whichRatio)
+        axes[r][c].set_ylim([0,1])
+        if c == 0:
+            axes[r][c].set_ylabel(kcov + ' (%)')
+        if r == rows-1:
+            axes[r][c].set_xlabel('t')
+        if r == 0 and c == cols -1:
+            axes[r][c].legend(algos)
+    fig.savefig(path)
+    return path
+
+def plotKcovHeatmap(path, kcov, algos, commRanges, simRatios, values):
+    """
+    Draws a k-coverage over communication range and ratio as heatmaps, one
+    per algorithm.
+
+    Parameters
+    ----------
+    path : str
+        the destination file
+    kcov : str
+        name of the k-coverage
+    algos : list of str
+        the algorithms, one heatmap each
+    commRanges, simRatios : list of float
+        the coordinates of the rows and of the columns of the heatmaps
+    values : ndarray
+        the values with shape (algorithm, communication range, ratio)
+
+    """
+    import seaborn as sns
+    rows = 4
+    cols = 2
+    gridspec_kw={'width_ratios': [1,1,0.05], 'height_ratios': [1,1,1,1]}
+    fig = newFigure(figsize=(8,10))
+    axes = fig.subplots(rows, cols+1, sharex='col', gridspec_kw=gridspec_kw)
+    axes[-1][-1].set_xlim([min(simRatios), max(simRatios)])
+    axes[-1][-1].set_ylim([0,1])
+    for idx,algo in enumerate(algos):
+        r = int(idx / cols)
+        c = int(idx % cols)
+        cbar = idx%cols == cols - 1 # only charts to the right have the bar
+        ax = sns.heatmap(values[idx], vmin=0, vmax=1, ax=axes[r][c], cbar=cbar, cbar_ax=axes[r][cols], cbar_kws={'label': kcov + ' (%)'})
+        if idx%cols == 0:
+            ax.set_ylabel('r')
+            ax.set_yticklabels([str(int(x)) for x in commRanges])
+        else:
+            ax.set_yticklabels([])
+        if idx >= cols * (rows - 1):
+            ax.set_xlabel('n/m')
+            ax.set_xticklabels(noOdds(simRatios))
+        ax.invert_yaxis()
+        ax.set_title(algo)
+    fig.savefig(path)
+    return path
+
+def plotKcovLinesByRatio(path, algos, simRatios, means, stds, labels, colors, rasterized=False):
+    """
+    Draws the k-coverages over the camera/object ratio, one subplot per
+    algorithm.
+
+    Parameters
+    ----------
+    path : str
+        the destination file
+    algos : list of str
+        the algorithms, one subplot each
+    simRatios : list of float
+        the ratios, along the x axis
+    means, stds : ndarray
+        mean and standard deviation with shape (k-coverage, algorithm, ratio)
+    labels, colors : list of str
+        legend and color of each k-coverage
+    rasterized : bool
+        draw the error bars as images, see plotKcov3D()
+
+    """
+    fig = newFigure(figsize=(8,10))
+    for idx,algo in enumerate(algos):
+        rows = 4
+        cols = 2
+        ax = fig.add_subplot(rows,cols,idx+1)
+        ax.set_ylim([0,1])
+        ax.set_xlim([min(simRatios) - 0.1, max(simRatios) + 0.1])
+        if idx%cols == 0:
+            ax.set_ylabel("Coverage (%)")
+        else:
+            ax.set_yticklabels([])
+        if idx >= cols * (rows - 1):
+            ax.set_xlabel("n/m")
+        ax.set_title(algo)
+        ax.set_xticks([0] + simRatios + [max(simRatios) + 0.1])
+        ax.set_xticklabels([""] + noOdds(simRatios) + [""])
+        for i,label in enumerate(labels):
+            ax.plot(simRatios, means[i, idx], label=label, color=colors[i])
+            bars = ax.errorbar(simRatios, means[i, idx], yerr=stds[i, idx], fmt='none', color=colors[i], elinewidth=1, capsize=0)
+            for artist in bars.get_children():
+                artist.set_rasterized(rasterized)
+        if idx == cols-1:
+            ax.legend()
+    fig.tight_layout()
+    fig.savefig(path, dpi=rasterDpi if rasterized else 'figure')
+    return path
+
+def plotKcovLinesByRange(path, algos, commRanges, means, stds, labels, colors, rasterized=False):
+    """
+    Draws the k-coverages over the communication range, one subplot per
+    algorithm.
+
+    Parameters
+    ----------
+    path : str
+        the destination file
+    algos : list of str
+        the algorithms, one subplot each
+    commRanges : list of float
+        the communication ranges, along the x axis
+    means, stds : ndarray
+        mean and standard deviation with shape (k-coverage, algorithm, range)
+    labels, colors : list of str
+        legend and color of each k-coverage
+    rasterized : bool
+        draw the error bars as images, see plotKcov3D()
+
+    """
+    import matplotlib
+    fig = newFigure(figsize=(8,10))
+    for idx,algo in enumerate(algos):
+        rows = 4
+        cols = 2
+        ax = fig.add_subplot(rows,cols,idx+1)
+        minRange = min(commRanges) - 10
+        maxRange = max(commRanges) + 10
+        ax.set_ylim([0,1])
+        ax.set_xlim([minRange, maxRange])
+        matplotlib.artist.setp(ax.get_xticklabels(), rotation=35, ha='right')
+        if idx%cols == 0:
+            ax.set_ylabel("Coverage (%)")
+        if idx < cols:
+            ax.set_xlabel("r")
+        if idx%rows != 0:
+            ax.set_yticklabels([])
+        ax.set_title(algo)
+        ax.set_xticks([minRange] + commRanges + [maxRange])
+        ax.set_xticklabels([""] + [str(round(c)) for c in commRanges] + [""])
+        for i,label in enumerate(labels):
+            ax.plot(commRanges, means[i, idx], label=label, color=colors[i])
+            bars = ax.errorbar(commRanges, means[i, idx], yerr=stds[i, idx], fmt='none', color=colors[i], elinewidth=1, capsize=0)
+            for artist in bars.get_children():
+                artist.set_rasterized(rasterized)
+        if idx == cols-1:
+            ax.legend()
+    fig.tight_layout()
+    fig.savefig(path, dpi=rasterDpi if rasterized else 'figure')
+    return path
+
+def writeKcovLatex(path, kcov, algos, commRanges, ratios, means, stds):
+    """
+    Writes the LaTeX table of a k-coverage for some communication ranges and
+    ratios.
+
+    Parameters
+    ----------
+    path : str
+        the destination file
+    kcov : str
+        name of the k-coverage
+    algos : list of str
+        the algorithms, one row each
+    commRanges : list of float
+        the communication ranges, one block of rows each
+    ratios : list of float
+        the ratios, one column each
+    means, stds : ndarray
+        mean and standard deviation with shape (range, algorithm, ratio)
+
+    """
+    import textwrap
+    txt = r'''
+    \begin{table}
+        \centering
+        \tiny
+        \begin{tabular}{lccccccc}%{lcccccccccccccccccccccccc}
+
+        \toprule
+        \multirow{2}{*}{$r$} & \multirow{2}{*}{\textsc{Approach}} 
+        & \multicolumn{6}{c}{\textsc{Ratio} $n/m$}\\
+        \cline{3-8}
+        & & ''' + '&'.join(['{:.1f}'.format(r) for r in ratios]) + r'\\'
+    for c, commRange in enumerate(commRanges):
+        txt += "\n\n        " + r'\midrule \multirow{8}{*}{' + str(commRange) + "}\n"
+        for a, algo in enumerate(algos):
+            txt += "        & " + algo.replace('_', r'\_') + ' '
+            for j, ratio in enumerate(ratios):
+                txt += '& {:.2f}'.format(means[c, a, j])
+                txt += ' ({:.2f}'.format(stds[c, a, j]) + ') '
+            txt += r'\\' + "\n"
+    txt += r'''
+        \bottomrule
+        \end{tabular}
+        \caption{Comparison of mean $OMC_k$ achieved by different approaches with 
+        different communications ranges $r$ and different ratios for 
+        objects/cameras, standard deviation is indicated in brackets.}
+        \label{tab:results}
+    \end{table}
+    '''
+    txt = textwrap.dedent(txt.strip())
+    with open(path, 'w') as f:
+        f.write(txt)
+    return path
+
+def plotKcovBarsByRatio(path, algos, simRatios, means, stds, labels, colors, ecolors):
+    """
+    Draws the k-coverages of the algorithms as bars, one subplot per
+    camera/object ratio.
+
+    Parameters
+    ----------
+    path : str
+        the destination file
+    algos : list of str
+        the algorithms, along the x axis
+    simRatios : list of float
+        the ratios, one subplot each
+    means, stds : ndarray
+        mean and standard deviation with shape (k-coverage, ratio, algorithm)
+    labels, colors, ecolors : list of str
+        legend, color and error bar color of each k-coverage
+
+    """
+    import matplotlib
+    fig = newFigure(figsize=(22,20))
+    for j,simRatio in enumerate(simRatios):
+        rows = 4
+        cols = 5
+        ax = fig.add_subplot(rows, cols,j+1)
+        ax.set_ylim([0,1])
+        ax.set_title("n/m = {0:.1f}".format(simRatio))
+        if j%cols == 0:
+            ax.set_ylabel("Coverage (%)")
+        matplotlib.artist.setp(ax.get_xticklabels(), rotation=35, ha='right')
+        ax.yaxis.grid(True)
+        for i,label in enumerate(labels):
+            ax.bar(algos, means[i, j], yerr=stds[i, j], label=label, capsize=4, color=colors[i], ecolor=ecolors[i])
+        if j == cols-1:
+            ax.legend()
+    fig.tight_layout()
+    fig.savefig(path)
+    return path
+
+def plotKcovBarsByRange(path, algos, commRanges, means, stds, labels, colors, ecolors):
+    """
+    Draws the k-coverages of the algorithms as bars, one subplot per
+    communication range.
+
+    Parameters
+    ----------
+    path : str
+        the destination file
+    algos : list of str
+        the algorithms, along the x axis
+    commRanges : list of float
+        the communication ranges, one subplot each
+    means, stds : ndarray
+        mean and standard deviation with shape (k-coverage, range, algorithm)
+    labels, colors, ecolors : list of str
+        legend, color and error bar color of each k-coverage
+
+    """
+    import matplotlib
+    fig = newFigure(figsize=(14,10))
+    for j,commRange in enumerate(commRanges):
+        size = ceil(sqrt(len(commRanges)))
+        rows = size-1
+        cols = size
+        ax = fig.add_subplot(rows, cols,j+1)
+        ax.set_ylim([0,1])
+        ax.set_title("Comm Range = {0:.0f}".format(commRange))
+        if j%cols == 0:
+            ax.set_ylabel("Coverage (%)")
+        matplotlib.artist.setp(ax.get_xticklabels(), rotation=35, ha='right')
+        ax.yaxis.grid(True)
+        for i,label in enumerate(labels):
+            ax.bar(algos, means[i, j], yerr=stds[i, j], label=label, capsize=4, color=colors[i], ecolor=ecolors[i])
+        if j == cols-1:
+            ax.legend()
+    fig.tight_layout()
+    fig.savefig(path)
+    return path
+
+def plotMovEfficiency(path, algos, values, errors, color, ecolor):
+    """
+    Draws the movement efficiency of the algorithms as bars.
+
+    Parameters
+    ----------
+    path : str
+        the destination file
+    algos : list of str
+        the algorithms, along the x axis
+    values, errors : ndarray
+        mean and standard deviation of each algorithm
+    color, ecolor : str
+        color of the bars and of the error bars
+
+    """
+    import matplotlib
+    fig = newFigure(figsize=(6,6))
+    ax = fig.add_subplot(1, 1, 1)
+    ax.set_ylim([0,1])
+    ax.set_ylabel("MovEfficiency (%)")
+    matplotlib.artist.setp(ax.get_xticklabels(), rotation=35, ha='right')
+    ax.yaxis.grid(True)
+    ax.bar(algos, values, yerr=errors, capsize=4, color=color, ecolor=ecolor)
+    fig.tight_layout()
+    fig.savefig(path)
+    return path
@@ -0,0 +1,850 @@
+"""
+Command line of the package, python -m smartcam_analysis [ingest|reduce|charts]:
+each stage reads what the previous one saved, and does nothing if its inputs
+did not change since its last run.
+"""
+import argparse
+import fnmatch
+import math
+import os
+import socket
+import sys
+import time
+from functools import partial
+
+import numpy as np
+
+from .catalog import Catalog
+from .charts import (chartFamilies, plotKcov3D, plotKcovBarsByRange, plotKcovBarsByRatio, plotKcovHeatmap, plotKcovInTime,
+                     plotKcovLinesByRange, plotKcovLinesByRatio, plotMovEfficiency, renderCharts, writeKcovLatex)
+from .ingest import (ExportTail, ReadAhead, archiveSuffixes, columnarPath, compressionSuffixes, convertExport, integrationModes, iterIngest, iterSummaries,
+                     mapFiles, memberSeparator, resampleExport)
+from .reduce import (PartialSummary, StreamingSummary, SummaryTable, cellDim, densify, minimumSeeds, reduceDataset, reduceRuns, runDim,
+                     seedConvergence)
+from .report import RunReport, progress
+from .storage import (blockPath, datasetPath, fileSignature, loadBlock, loadManifest, loadPartial, loadReductions, openDataset, partialPath,
+                      readInTime, reductionsPath, saveBlock, saveDataset, saveManifest, savePartial, saveReductions, spliceExports,
+                      spliceRuns)
+
+# CONFIGURE SCRIPT
+directory = 'data'
+charts_dir = 'charts/'
+datasetOutput = 'data_summary'
+storageChunks = {'Seed': 10, 'time': 500, runDim: 100} # chunks of the saved datasets, other dimensions are not split
+storageDtypes = {'*-coverage': np.float32} # coverages are percentages, other variables are stored as float64
+cacheDir = datasetOutput + '_cache'
+storeDir = datasetOutput + '_store' # columnar copies of the exports written by the convert stage
+hashContents = False # also compare the content of the files to find the changed ones
+sparseRuns = False # store one row per export and summary per combination that exists, for irregular sweeps
+readAheadThreads = 2 # threads reading the next exports while one is parsed, 0 not to read ahead
+readAheadMB = 256 # largest size of the exports read ahead and not yet parsed
+experiments = ['simulations']
+floatPrecision = '{: 0.2f}'
+seedVars = ['Seed']
+timeSamples = 2000
+minTime = 0
+maxTime = 2000
+timeColumnName = 'time'
+logarithmicTime = False
+resampleMode = 'nearest' # one of resampleModes
+inTimeLevels = (500, 100) # instants of the coarser copies of the values in time saved with the summaries
+inTimeLimit = 100 # the charts in time show the instants before it
+seedsVariables = ['1-coverage', '2-coverage', '3-coverage'] # variables of the seeds stage, its precision is in their unit
+sumRatios = {'MovEfficiency': ('ObjDist', 'CamDist')} # variables computed from the sums over time
+rasterizeCharts = False # draw the 3D surfaces and the error bars of the lines as images, for smaller PDFs
+
+kcovColors = ['#00d0ebFF','#61a72cFF','#e30000FF']
+kcovEcolors = ['#0300ebFF', '#8cff9dFF', '#f5b342FF'] # error bars
+kcovVariables = ['1-coverage','2-coverage','3-coverage']
+kcovTrans = ['1-cov','2-cov','3-cov']
+algos = ['ff_linpro', 'zz_linpro','ff_linproF', 'zz_linproF', 'ff_nocomm', 'nocomm', 'sm_av', 'bc_re']#data.coords['Algorithm'].data.tolist()
+
+stages = ('convert', 'ingest', 'reduce', 'charts', 'all', 'watch', 'partial', 'merge', 'seeds')
+
+def experimentFiles(experiment, catalog):
+    """
+    Lists the exports of an experiment: the files sorted by name, compressed
+    or not, then the members of the tar archives in their order, as
+    archive::member.
+    """
+    pattern = experiment + '_*.txt'
+    names = sorted(os.listdir(directory))
+    allfiles = [directory + '/' + name for name in names if any(fnmatch.fnmatch(name, pattern + suffix) for suffix in ('',) + compressionSuffixes)]
+    for name in names:
+        if name.endswith(archiveSuffixes):
+            archive = directory + '/' + name
+            allfiles += [archive + memberSeparator + member for member in catalog.members(archive, timeColumnName)
+                         if fnmatch.fnmatch(os.path.basename(member), pattern)]
+    return allfiles
+
+def scanExperiment(experiment, workers=1):
+    """
+    Lists the exports of an experiment with what their headers hold, reading
+    only the ones that are not in the catalog or that changed since. The
+    exports are read in full only when minTime or maxTime is not set and
+    their span is not known yet.
+
+    Returns
+    -------
+    list of CatalogEntry
+        The entries of the exports, in the order of experimentFiles()
+    """
+    with Catalog(os.path.join(cacheDir, 'catalog.sqlite')) as catalog:
+        return catalog.update(experiment, experimentFiles(experiment, catalog), timeColumnName, hashContents, workers,
+                              minTime is None or maxTime is None)
+
+def countRows(rows):
+    """
+    Records in the catalog the number of rows of the exports a stage read,
+    see Catalog.count().
+    """
+    with Catalog(os.path.join(cacheDir, 'catalog.sqlite')) as catalog:
+        catalog.count(rows)
+
+def readablePaths(experiment, entries):
+    """
+    Where to read each export from: its columnar copy if the convert stage
+    wrote it from the current version of the file, the file otherwise.
+
+    Returns
+    -------
+    dict
+        path of the export: path to read
+    """
+    converted = loadManifest(cacheDir, 'store').get(experiment, {})
+    paths = {}
+    for entry in entries:
+        copy = columnarPath(storeDir, entry.path)
+        paths[entry.path] = copy if converted.get(entry.path) == entry.signature and os.path.exists(copy) else entry.path
+    return paths
+
+def experimentTimeline(entries):
+    """
+    Computes the timeline the exports are resampled onto, taking the time
+    span of the catalog entries when minTime or maxTime are not set. The
+    entries must then come from scanExperiment() with their span, the empty
+    exports have none and are left out.
+    """
+    timefun = np.logspace if logarithmicTime else np.linspace
+    first, last = minTime, maxTime
+    if first is None or last is None:
+        spans = [(entry.first, entry.last) for entry in entries if entry.rows != 0]
+        if not spans or any(math.isnan(time) for span in spans for time in span):
+            raise ValueError('the time span of the exports is not known, set minTime and maxTime')
+    if last is None:
+        last = max(span[1] for span in spans)
+    if first is None:
+        first = min(span[0] for span in spans)
+    return timefun(first, last, timeSamples)
+
+def readingAhead(args):
+    """
+    The ReadAhead of a stage reading the exports in this process, None if
+    they are read by a pool of processes or args.read_ahead is 0.
+    """
+    if args.read_ahead <= 0 or (args.workers or os.cpu_count()) > 1:
+        return None
+    return ReadAhead(args.read_ahead, args.read_ahead_mb * 2 ** 20)
+
+def load(experiment='simulations', workers=1, **selection):
+    """
+    Reads only the exports of an experiment whose header matches a selection,
+    as load(Algorithm=['ff_linpro'], CommunicationRange=100), reusing the
+    files cached by ingest when they are up to date.
+
+    Parameters
+    ----------
+    experiment : str
+        the experiment
+    workers : int
+        processes reading the exports that are not cached
+    selection : dict
+        variable: value or list of values, see Catalog.entries()
+
+    Returns
+    -------
+    xarray.Dataset
+        The selected exports, resampled as by ingest
+    """
+    entries = scanExperiment(experiment, workers)
+    timeline = experimentTimeline(entries)
+    with Catalog(os.path.join(cacheDir, 'catalog.sqlite')) as catalog:
+        selected = catalog.entries(experiment, **selection)
+    # The blocks of ingest can be reused if they were resampled the same way
+    cached = loadManifest(cacheDir).get(experiment, {})
+    if cached.get('settings') != (timeColumnName, resampleMode, timeline.tolist()):
+        cached = {}
+    cached = cached.get('files', {})
+    stale = [entry.path for entry in selected if entry.path not in cached or tuple(cached[entry.path]['signature']) != entry.signature]
+    readable = readablePaths(experiment, selected)
+    readAhead = ReadAhead(readAheadThreads, readAheadMB * 2 ** 20) if readAheadThreads > 0 else None
+    exports = dict(zip(stale, iterIngest([readable[file] for file in stale], timeColumnName, timeline, resampleMode, workers, readAhead)))
+    exports = [exports[entry.path] if entry.path in exports else loadBlock(cacheDir, entry.path) for entry in selected]
+    return (spliceRuns if sparseRuns else spliceExports)(None, exports, timeColumnName, timeline, (), storageDtypes)
+
+def convert(args, report=None):
+    """
+    Writes the columnar copies of the exports that are new or changed since
+    they were last converted, and deletes the copies of the removed ones.
+    The other stages then read the copies instead of parsing the text.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        the command line
+    report : RunReport
+        where to record the time spent, None not to record it
+
+    Returns
+    -------
+    list of str
+        The experiments whose copies were updated
+    """
+    report = RunReport() if report is None else report
+    converted = loadManifest(cacheDir, 'store')
+    updated = []
+    for experiment in experiments:
+        with report.stage('scan', experiment=experiment) as record:
+            entries = scanExperiment(experiment, args.workers)
+            record['files'] = len(entries)
+        done = converted.get(experiment, {})
+        readable = readablePaths(experiment, entries)
+        stale = [entry for entry in entries if readable[entry.path] == entry.path]
+        removed = [file for file in done if file not in readable]
+        if not stale and not removed:
+            continue
+        print(experiment + ': converting ' + str(len(stale)) + ' files, ' + str(len(removed)) + ' removed')
+        with report.stage('convert', experiment=experiment) as record:
+            rows = mapFiles(partial(convertExport, storeDir=storeDir), [entry.path for entry in stale], args.workers)
+            record['files'] = record['rows'] = 0
+            counts = {}
+            for entry, count in zip(stale, progress(rows, len(stale), experiment)):
+                done[entry.path] = entry.signature
+                record['files'] += 1
+                record['rows'] += count
+                counts[entry.path] = count
+        countRows(counts)
+        for file in removed:
+            del done[file]
+            for copy in (columnarPath(storeDir, file), columnarPath(storeDir, file)[:-4] + '.json'):
+                if os.path.exists(copy):
+                    os.remove(copy)
+        converted[experiment] = done
+        updated.append(experiment)
+    if updated:
+        saveManifest(cacheDir, converted, 'store')
+    return updated
+
+def ingest(args, report=None):
+    """
+    Reprocesses the exports that changed since the last run, and splices them
+    into the saved datasets.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        the command line
+    report : RunReport
+        where to record the time spent on each step, None not to record it
+
+    Returns
+    -------
+    list of str
+        The experiments whose dataset was updated
+    """
+    report = RunReport() if report is None else report
+    manifest = loadManifest(cacheDir)
+    updated = []
+    for experiment in experiments:
+        with report.stage('scan', experiment=experiment) as record:
+            catalog = scanExperiment(experiment, args.workers)
+            allfiles = [entry.path for entry in catalog]
+            signatures = {entry.path: entry.signature for entry in catalog}
+            readable = readablePaths(experiment, catalog)
+            timeline = experimentTimeline(catalog)
+            record['files'] = len(allfiles)
+        settings = (timeColumnName, resampleMode, timeline.tolist())
+        previous = manifest.get(experiment, {})
+        entries = previous.get('files', {}) if previous.get('settings') == settings else {}
+        changed = [file for file in allfiles if file not in entries or entries[file]['signature'] != signatures[file]]
+        removed = [file for file in entries if file not in signatures]
+        path = datasetPath(datasetOutput, experiment)
+        sparse = args.sparse or sparseRuns
+        # The blocks do not depend on the layout, only the dataset is built again
+        relayout = previous.get('sparse', False) != sparse
+        if entries and os.path.exists(path) and not changed and not removed and not relayout:
+            continue
+        dataset = openDataset(path) if entries and os.path.exists(path) and not relayout else None
+        print(experiment + ': ' + str(len(changed)) + ' new or changed files, ' + str(len(removed)) + ' removed')
+        if dataset is not None:
+            # Splicing needs the values in memory, and the file is going to be replaced
+            with report.stage('load', experiment=experiment):
+                dataset.load().close()
+        # Read and resample the new files, in parallel if requested
+        with report.stage('read', experiment=experiment) as record:
+            readAhead = readingAhead(args)
+            exports = iterIngest([readable[file] for file in changed], timeColumnName, timeline, resampleMode, args.workers, readAhead)
+            exports = list(progress(exports, len(changed), experiment))
+            record['files'] = len(exports)
+            record['rows'] = sum(export.rows for export in exports)
+            if readAhead is not None:
+                record.update(readAhead.metrics())
+        countRows({file: export.rows for file, export in zip(changed, exports)})
+        with report.stage('cache', experiment=experiment) as record:
+            for file, export in zip(changed, exports):
+                saveBlock(cacheDir, file, export)
+                entries[file] = {'signature': signatures[file], 'coordinates': export.coordinates}
+            record['files'] = len(changed)
+        with report.stage('splice', experiment=experiment) as record:
+            if dataset is None:
+                # The previous dataset is lost, but the blocks of the unchanged files are still good
+                exports = [loadBlock(cacheDir, file) for file in allfiles if file not in changed] + exports
+            dataset = (spliceRuns if sparse else spliceExports)(dataset, exports, timeColumnName, timeline,
+                                    [entries[file]['coordinates'] for file in removed], storageDtypes)
+            record['files'] = len(exports)
+        with report.stage('save', experiment=experiment):
+            saveDataset(dataset, path, storageChunks)
+        del dataset, exports
+        for file in removed:
+            del entries[file]
+            if os.path.exists(blockPath(cacheDir, file)):
+                os.remove(blockPath(cacheDir, file))
+        manifest[experiment] = {'settings': settings, 'files': entries, 'sparse': sparse}
+        updated.append(experiment)
+    if updated:
+        # The datasets are already saved, a stale manifest would only cause extra work
+        saveManifest(cacheDir, manifest)
+    return updated
+
+def reduce(args, report=None):
+    """
+    Computes the summaries of the experiments whose data changed since they
+    were last computed, from the saved datasets or, with args.streaming,
+    folding the exports as they are read without building the datasets or,
+    with args.exact, integrating the rows of the exports.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        the command line
+    report : RunReport
+        where to record the time spent, None not to record it
+
+    Returns
+    -------
+    list of str
+        The experiments whose summaries were computed
+    """
+    report = RunReport() if report is None else report
+    sources = loadManifest(cacheDir, 'reductions')
+    updated = []
+    for experiment in experiments:
+        if args.exact or args.streaming:
+            catalog = scanExperiment(experiment, args.workers)
+            timeline = experimentTimeline(catalog)
+            source = (foldingMethod(args, timeline), timeline.tolist(), {entry.path: entry.signature for entry in catalog})
+        else:
+            source = ('dataset', fileSignature(datasetPath(datasetOutput, experiment)))
+        source += (seedVars, sumRatios, inTimeLevels, args.sparse or sparseRuns)
+        path = reductionsPath(datasetOutput, experiment)
+        if sources.get(experiment) == source and os.path.exists(path):
+            continue
+        print(experiment + ': computing the summaries')
+        with report.stage('reduce', experiment=experiment) as record:
+            if args.exact or args.streaming:
+                summary = StreamingSummary(seedVars, timeColumnName, timeline, sumRatios)
+                reduced = foldExports(summary, experiment, catalog, timeline, args, record).reductions(args.sparse or sparseRuns)
+            else:
+                with openDataset(datasetPath(datasetOutput, experiment)) as dataset:
+                    reduceStored = reduceRuns if runDim in dataset.dims else reduceDataset
+                    reduced = reduceStored(dataset, seedVars, timeColumnName, sumRatios)
+            saveReductions(reduced, path, timeColumnName, inTimeLevels)
+        sources[experiment] = source
+        updated.append(experiment)
+    if updated:
+        saveManifest(cacheDir, sources, 'reductions')
+    return updated
+
+def foldingMethod(args, timeline):
+    """
+    How foldExports() computes the summaries with the command line args.
+    """
+    if args.exact:
+        # The exact reductions resample the files only for the charts in time
+        timed = 'intime' in args.charts
+        return ('exact', timeColumnName, args.exact, (timeline[0], timeline[-1]), timed and resampleMode)
+    return ('streaming', timeColumnName, resampleMode)
+
+def foldExports(summary, experiment, catalog, timeline, args, record):
+    """
+    Folds the exports of an experiment into a summary as soon as each one is
+    read, the full dataset is never built.
+
+    Parameters
+    ----------
+    summary : StreamingSummary
+        where to fold the exports
+    experiment : str
+        the experiment
+    catalog : list of CatalogEntry
+        its exports, see scanExperiment()
+    timeline : ndarray
+        the timeline to resample onto
+    args : argparse.Namespace
+        the command line: with args.exact the means and totals are computed
+        from the rows of each file, where the file is read, otherwise from
+        the values resampled onto the timeline
+    record : dict
+        the stage of the RunReport, where to count the files and rows
+
+    Returns
+    -------
+    StreamingSummary
+        The summary
+    """
+    readable = readablePaths(experiment, catalog)
+    files = [readable[entry.path] for entry in catalog]
+    readAhead = readingAhead(args)
+    if args.exact:
+        timed = 'intime' in args.charts
+        exports = iterSummaries(files, timeColumnName, args.exact, (timeline[0], timeline[-1]), timeline if timed else None, resampleMode,
+                                args.workers, readAhead)
+    else:
+        exports = iterIngest(files, timeColumnName, timeline, resampleMode, args.workers, readAhead)
+    record['files'] = record['rows'] = 0
+    rows = {}
+    for entry, export in zip(catalog, progress(exports, len(files), experiment)):
+        if args.exact:
+            summary.fold(export.coordinates, export.names, export.means, export.sums, export.data)
+        else:
+            summary.add(export)
+        record['files'] += 1
+        record['rows'] += export.rows
+        rows[entry.path] = export.rows
+    if readAhead is not None:
+        record.update(readAhead.metrics())
+    countRows(rows)
+    return summary
+
+def partialStage(args, report=None):
+    """
+    Folds the exports of this machine into partial summaries, one file per
+    experiment, to be merged with the ones of the other machines.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        the command line, see foldExports()
+    report : RunReport
+        where to record the time spent, None not to record it
+
+    Returns
+    -------
+    list of str
+        The files written
+    """
+    report = RunReport() if report is None else report
+    written = []
+    for experiment in experiments:
+        with report.stage('partial', experiment=experiment) as record:
+            catalog = scanExperiment(experiment, args.workers)
+            timeline = experimentTimeline(catalog)
+            summary = PartialSummary(seedVars, timeColumnName, timeline, sumRatios)
+            foldExports(summary, experiment, catalog, timeline, args, record)
+            written.append(partialPath(datasetOutput, experiment, socket.gethostname()))
+            savePartial(summary, written[-1], experiment=experiment, method=foldingMethod(args, timeline))
+        print(experiment + ': ' + str(len(catalog)) + ' exports folded into ' + written[-1])
+    return written
+
+def merge(args, report=None):
+    """
+    Merges the partial summaries in args.partials, written by partialStage() on
+    any number of machines, and saves the summaries of each experiment as
+    reduce does. The result does not depend on the order of the files.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        the command line
+    report : RunReport
+        where to record the time spent, None not to record it
+
+    Returns
+    -------
+    list of str
+        The experiments whose summaries were computed
+    """
+    report = RunReport() if report is None else report
+    sources = loadManifest(cacheDir, 'reductions')
+    merged = {}
+    with report.stage('merge') as record:
+        for path in args.partials:
+            summary, labels = loadPartial(path)
+            experiment = labels['experiment']
+            if experiment not in merged:
+                merged[experiment] = (summary, labels['method'], [path])
+                continue
+            total, method, paths = merged[experiment]
+            if labels['method'] != method:
+                raise ValueError(path + ' was computed with ' + str(labels['method']) + ', ' + paths[0] + ' with ' + str(method))
+            total.merge(summary)
+            paths.append(path)
+        record['files'] = len(args.partials)
+    for experiment, (summary, method, paths) in merged.items():
+        with report.stage('reduce', experiment=experiment):
+            saveReductions(summary.reductions(args.sparse or sparseRuns), reductionsPath(datasetOutput, experiment), timeColumnName, inTimeLevels)
+        print(experiment + ': ' + str(len(summary.files)) + ' exports merged from ' + str(len(paths)) + ' files')
+        sources[experiment] = ('merge', sorted(fileSignature(path) + (path,) for path in paths))
+    if merged:
+        saveManifest(cacheDir, sources, 'reductions')
+    return list(merged)
+
+def watch(args, report=None):
+    """
+    Follows the exports while the simulations write them, parsing only the
+    rows appended since the last poll. A simulation is complete when its
+    export reaches maxTime or ends, then it is folded into the summaries of
+    its experiment, saved as by reduce, so that the charts can be drawn from
+    the seeds finished so far. What was read is saved to the cache after each
+    poll, a new run goes on from there.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        the command line, with the seconds between two polls in args.interval
+        and args.once to poll only once
+    report : RunReport
+        where to record the time spent, None not to record it
+
+    """
+    report = RunReport() if report is None else report
+    timeline = (np.logspace if logarithmicTime else np.linspace)(minTime, maxTime, timeSamples)
+    state = loadManifest(cacheDir, 'watch')
+    if state.get('settings') != (timeColumnName, resampleMode, timeline.tolist(), seedVars, sumRatios):
+        state = {'settings': (timeColumnName, resampleMode, timeline.tolist(), seedVars, sumRatios)}
+    sources = loadManifest(cacheDir, 'reductions')
+    while True:
+        with report.stage('poll') as record:
+            record['files'] = record['rows'] = 0
+            for experiment in experiments:
+                # running: path: ExportTail, complete: path: size when it was folded into summary
+                running, complete, summary = state.setdefault(experiment, ({}, {}, StreamingSummary(seedVars, timeColumnName, timeline, sumRatios)))
+                finished = []
+                for name in sorted(os.listdir(directory)):
+                    file = directory + '/' + name
+                    if not fnmatch.fnmatch(name, experiment + '_*.txt'):
+                        continue
+                    if file in complete:
+                        if os.path.getsize(file) < complete[file]:
+                            print(file + ' was rewritten after it was complete, its new content is ignored')
+                            complete[file] = os.path.getsize(file)
+                        continue
+                    tail = running.get(file)
+                    if tail is None or os.path.getsize(file) < tail.offset:
+                        tail = running[file] = ExportTail(file) # new or restarted
+                    record['rows'] += tail.poll()
+                    record['files'] += 1
+                    if tail.ended or tail.lastTime(timeColumnName) >= maxTime:
+                        summary.add(resampleExport(tail.export(), timeColumnName, timeline, resampleMode))
+                        complete[file] = tail.offset
+                        del running[file]
+                        finished.append(file)
+                if finished:
+                    saveReductions(summary.reductions(args.sparse or sparseRuns), reductionsPath(datasetOutput, experiment), timeColumnName, inTimeLevels)
+                    # not the summaries of any source of reduce, it computes them again
+                    sources[experiment] = ('watch',)
+                    saveManifest(cacheDir, sources, 'reductions')
+                print('{}: {} simulations complete ({} now), {} running'.format(experiment, len(complete), len(finished), len(running)), flush=True)
+            saveManifest(cacheDir, state, 'watch')
+        if args.once:
+            return
+        time.sleep(args.interval)
+
+def chartJobs(reduced, families=chartFamilies, chartsDir=charts_dir, rasterized=rasterizeCharts):
+    """
+    Cuts, from the summaries, the arrays each chart needs.
+
+    Parameters
+    ----------
+    reduced : Reductions
+        the summaries of the simulations experiment
+    families : list of str
+        the families of charts, among chartFamilies
+    chartsDir : str
+        prefix of the paths of the charts
+    rasterized : bool
+        draw the heavy artists of the 3D and lines charts as images
+
+    Returns
+    -------
+    list of (function, dict)
+        The jobs drawing the charts, see renderCharts()
+    """
+    # Positional access to the summaries, the charts get plain arrays cut from here
+    table = SummaryTable(reduced, ['Algorithm', 'CamObjRatio', 'CommunicationRange'])
+    
+    simRatios = table.coords['CamObjRatio']
+    commRanges = table.coords['CommunicationRange']
+    # Each job draws one file, from the few values it needs
+    jobs = []
+    
+    """""""""""""""""""""""""""
+                kcov 3D
+    """""""""""""""""""""""""""
+    if '3d' in families:
+        forKcov = [0, len(kcovVariables) - 1]
+        surfaces = [[table.get('timeMean', kcovVariables[k], Algorithm=algo).T for k in forKcov] for algo in algos]
+        jobs.append((plotKcov3D, dict(path=chartsDir + 'KCov_3D.pdf', algos=algos, commRanges=commRanges, simRatios=simRatios, surfaces=surfaces,
+                                      labels=[kcovTrans[k] for k in forKcov], colors=[kcovColors[k] for k in forKcov], rasterized=rasterized)))
+    
+    """""""""""""""""""""""""""
+          kcov in time
+    """""""""""""""""""""""""""
+    if 'intime' in families and not reduced.inTime.data_vars:
+        print('intime: the summaries have no values in time, reduce them with --charts intime')
+    elif 'intime' in families:
+        selAlgos = ['ff_linpro', 'zz_linpro', 'ff_nocomm', 'nocomm']
+        selRatios = ['0.4', '0.8', '1.2', '1.8']
+        selKcov = ['1-coverage', '3-coverage']
+        selCommRange = 100
+        dataInTime = reduced.inTime
+        times = dataInTime[timeColumnName].values
+        timeLimitIdx = np.searchsorted(times, inTimeLimit) # first idx of time >= inTimeLimit
+        for whichKCov in selKcov:
+            values = [densify(dataInTime[whichKCov], cellDim, CamObjRatio=float(whichRatio), CommunicationRange=selCommRange, Algorithm=selAlgos)
+                      .transpose(timeColumnName, 'Algorithm').values[:timeLimitIdx] for whichRatio in selRatios]
+            jobs.append((plotKcovInTime, dict(path=chartsDir + whichKCov + '_InTime.pdf', kcov=whichKCov, ratios=selRatios,
+                                              times=times[:timeLimitIdx], values=values, algos=selAlgos)))
+    
+    """""""""""""""""""""""""""
+              heatmaps
+    """""""""""""""""""""""""""
+    if 'heatmap' in families:
+        for whichKCov in kcovVariables:
+            values = np.transpose(table.get('timeMean', whichKCov, Algorithm=algos), (0, 2, 1))
+            jobs.append((plotKcovHeatmap, dict(path=chartsDir + whichKCov + '_heatmap.pdf', kcov=whichKCov, algos=algos,
+                                               commRanges=commRanges, simRatios=simRatios, values=values)))
+    
+    """""""""""""""""""""""""""
+           kcov lines
+    """""""""""""""""""""""""""
+    if 'lines' in families:
+        for commRange in commRanges:
+            means = np.stack([table.get('timeMean', s, Algorithm=algos, CommunicationRange=commRange, CamObjRatio=simRatios) for s in kcovVariables])
+            stds = np.stack([table.get('timeMeanStd', s, Algorithm=algos, CommunicationRange=commRange, CamObjRatio=simRatios) for s in kcovVariables])
+            jobs.append((plotKcovLinesByRatio, dict(path=chartsDir + 'KCov_lines_CommRange-'+str(int(commRange))+'_CamObjRatio-variable.pdf',
+                                                    algos=algos, simRatios=simRatios, means=means, stds=stds, labels=kcovTrans, colors=kcovColors,
+                                                    rasterized=rasterized)))
+        for simRatio in simRatios:
+            means = np.stack([table.get('timeMean', s, Algorithm=algos, CamObjRatio=simRatio, CommunicationRange=commRanges) for s in kcovVariables])
+            stds = np.stack([table.get('timeMeanStd', s, Algorithm=algos, CamObjRatio=simRatio, CommunicationRange=commRanges) for s in kcovVariables])
+            jobs.append((plotKcovLinesByRange, dict(path=chartsDir + 'KCov_lines_CommRange-variable_CamObjRatio-'+str(simRatio)+'.pdf',
+                                                    algos=algos, commRanges=commRanges, means=means, stds=stds, labels=kcovTrans, colors=kcovColors,
+                                                    rasterized=rasterized)))
+    
+    """""""""""""""""""""""""""
+        LaTeX table
+    """""""""""""""""""""""""""
+    if 'latex' in families:
+        selKcov = '3-coverage'
+        selCommRanges = [25, 50, 100]
+        selRatios = [0.2, 0.6, 1, 1.2, 1.6, 2]
+        means = np.stack([table.get('timeMean', selKcov, Algorithm=algos, CommunicationRange=commRange, CamObjRatio=selRatios) for commRange in selCommRanges])
+        stds = np.stack([table.get('timeMeanStd', selKcov, Algorithm=algos, CommunicationRange=commRange, CamObjRatio=selRatios) for commRange in selCommRanges])
+        jobs.append((writeKcovLatex, dict(path=chartsDir + 'KCov_latex.txt', kcov=selKcov, algos=algos, commRanges=selCommRanges,
+                                          ratios=selRatios, means=means, stds=stds)))
+    
+    """""""""""""""""""""""""""
+        kcoverage comparison
+    """""""""""""""""""""""""""
+    # The subplots go from the largest ratio and range to the smallest
+    if 'bars' in families:
+        for commRange in commRanges[::-1]:
+            means = np.stack([table.get('timeMean', s, Algorithm=algos, CamObjRatio=simRatios[::-1], CommunicationRange=commRange).T for s in kcovVariables])
+            stds = np.stack([table.get('timeMeanStd', s, Algorithm=algos, CamObjRatio=simRatios[::-1], CommunicationRange=commRange).T for s in kcovVariables])
+            jobs.append((plotKcovBarsByRatio, dict(path=chartsDir + 'KCov_CommRange-'+str(commRange)+'_CamObjRatio-variable.pdf', algos=algos,
+                                                   simRatios=simRatios[::-1], means=means, stds=stds, labels=kcovTrans, colors=kcovColors, ecolors=kcovEcolors)))
+        algosWithoutNocomm = algos#[a for a in algos if a != "nocomm"]
+        for simRatio in simRatios[::-1]:
+            means = np.stack([table.get('timeMean', s, Algorithm=algosWithoutNocomm, CamObjRatio=simRatio, CommunicationRange=commRanges[::-1]).T for s in kcovVariables])
+            stds = np.stack([table.get('timeMeanStd', s, Algorithm=algosWithoutNocomm, CamObjRatio=simRatio, CommunicationRange=commRanges[::-1]).T for s in kcovVariables])
+            jobs.append((plotKcovBarsByRange, dict(path=chartsDir + 'KCov_CommRange-variable_CamObjRatio-'+str(simRatio)+'.pdf', algos=algosWithoutNocomm,
+                                                   commRanges=commRanges[::-1], means=means, stds=stds, labels=kcovTrans, colors=kcovColors, ecolors=kcovEcolors)))
+    
+    """""""""""""""""""""""""""
+        distance traveled
+    """""""""""""""""""""""""""
+    if 'movefficiency' in families:
+        simRatio = 1
+        for commRange in commRanges[::-1]:
+            values = table.get('timeSum', 'MovEfficiency', Algorithm=algos, CamObjRatio=simRatio, CommunicationRange=commRange)
+            errors = table.get('timeSumStd', 'MovEfficiency', Algorithm=algos, CamObjRatio=simRatio, CommunicationRange=commRange)
+            jobs.append((plotMovEfficiency, dict(path=chartsDir + 'MovEfficiency_CamObjRatio-'+str(simRatio)+'_CommRange-'+str(commRange)+'.pdf',
+                                                 algos=algos, values=values, errors=errors, color=kcovColors[-1], ecolor=kcovEcolors[-1])))
+    return jobs
+
+def charts(args, report=None):
+    """
+    Draws the chart families in args.charts from the saved summaries, only the
+    charts whose inputs changed since the last run.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        the command line
+    report : RunReport
+        where to record the time spent, None not to record it
+
+    Returns
+    -------
+    list of str
+        The files written
+    """
+    report = RunReport() if report is None else report
+    with report.stage('charts') as record:
+        path = reductionsPath(datasetOutput, 'simulations')
+        # Only the window of the values in time shown by the charts is read
+        reduced = loadReductions(path, inTime=False)
+        if 'intime' in args.charts:
+            reduced = reduced._replace(inTime=readInTime(path, timeColumnName, stop=inTimeLimit))
+        jobs = chartJobs(reduced, args.charts, rasterized=args.rasterize or rasterizeCharts)
+        # Draw only the charts whose data, parameters or code changed since the last run
+        chartFingerprints = loadManifest(cacheDir, 'charts')
+        rendered = renderCharts(jobs, args.workers, chartFingerprints)
+        saveManifest(cacheDir, chartFingerprints, 'charts')
+        record['rendered'] = len(rendered)
+        record['reused'] = len(jobs) - len(rendered)
+    print('charts: ' + str(len(rendered)) + ' rendered, ' + str(len(jobs) - len(rendered)) + ' reused')
+    return rendered
+
+def seeds(args, report=None):
+    """
+    Finds how many seeds each combination of the experiment variables needs
+    for the confidence intervals of the means over time among seeds of
+    args.variables to stay within args.precision (relative to the means with
+    args.relative), at confidence args.confidence. Saves the half-widths as the seeds
+    accumulate and the minimum numbers of seeds to
+    data_summary_<experiment>_seeds.nc, and prints how many simulations
+    would have been enough.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        the command line
+    report : RunReport
+        where to record the time spent, None not to record it
+
+    Returns
+    -------
+    dict
+        experiment: the minimum number of seeds, as an xarray.Dataset
+    """
+    report = RunReport() if report is None else report
+    results = {}
+    for experiment in experiments:
+        with report.stage('seeds', experiment=experiment):
+            with openDataset(datasetPath(datasetOutput, experiment)) as dataset:
+                # one row per export is laid out over the variables once reduced over time
+                dataMean = densify(dataset[args.variables].mean(timeColumnName).load(), runDim)
+            widths = seedConvergence(dataMean, seedVars, args.confidence)
+            needed = minimumSeeds(widths, args.precision, dataMean.mean(seedVars) if args.relative else None)
+            path = datasetOutput + '_' + experiment + '_seeds.nc'
+            widths.to_netcdf(path + '.tmp', mode='w', group='halfWidth')
+            needed.to_netcdf(path + '.tmp', mode='a', group='minimumSeeds')
+            os.replace(path + '.tmp', path)
+        run = len(widths['seeds'])
+        print('{}: {} seeds run, half-width of the {:.0%} intervals within {}{}, saved to {}'.format(
+            experiment, run, args.confidence, args.precision, ' of the mean' if args.relative else '', path))
+        for v in needed.data_vars:
+            converged = needed[v].notnull()
+            print('  {:<16} {:4d}/{} combinations converged, median {:g} seeds, maximum {:g}'.format(
+                v, int(converged.sum()), converged.size, float(needed[v].median()), float(needed[v].max())))
+        # a combination is done when all of the variables analysed are
+        perCell = needed.to_array().max('variable', skipna=False).fillna(run)
+        print('  {:.0f} of {} simulations were enough for every variable ({:.0%} saved)'.format(
+            float(perCell.sum()), perCell.size * run, 1 - float(perCell.sum()) / (perCell.size * run)))
+        results[experiment] = needed
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Processes the Alchemist exports and draws the charts.')
+    parser.add_argument('stage', nargs='?', choices=stages, default='all',
+                        help='convert the exports to columnar copies read instead of the text, ingest the exports that changed, '
+                             'reduce them to summaries, draw the charts, all of them but convert (default), '
+                             'watch the exports while the simulations write them, fold the exports of this machine into a partial summary, '
+                             'merge the partial summaries of several machines, '
+                             'or find how many seeds are enough for the means among seeds to converge')
+    parser.add_argument('partials', nargs='*', metavar='PARTIAL', help='the partial summaries to merge')
+    parser.add_argument('--workers', type=int, default=1, metavar='N',
+                        help='number of processes reading the exports and drawing the charts, 0 uses all the cores (default: 1)')
+    parser.add_argument('--read-ahead', type=int, default=readAheadThreads, metavar='N',
+                        help='number of threads reading the next exports while one is parsed, with --workers 1, 0 not to read ahead'
+                             ' (default: {})'.format(readAheadThreads))
+    parser.add_argument('--read-ahead-mb', type=float, default=readAheadMB, metavar='MB',
+                        help='largest size of the exports read ahead and not yet parsed (default: {})'.format(readAheadMB))
+    parser.add_argument('--sparse', action='store_true',
+                        help='store one row per export and summaries only for the combinations of the variables that were run,'
+                             ' instead of the product of their values, for irregular sweeps')
+    parser.add_argument('--streaming', action='store_true',
+                        help='reduce the exports as soon as they are read, without building the full dataset (ingest does nothing)')
+    parser.add_argument('--exact', choices=integrationModes, metavar='MODE',
+                        help='reduce the rows of the exports to time-weighted means and totals, with ' + ' or '.join(integrationModes) +
+                             ' integration, resampling them only for the charts in time (ingest does nothing)')
+    parser.add_argument('--charts', nargs='+', choices=chartFamilies, default=chartFamilies, metavar='FAMILY',
+                        help='draw only some families of charts, among ' + ', '.join(chartFamilies) + ' (default: all)')
+    parser.add_argument('--interval', type=float, default=60, metavar='SECONDS',
+                        help='seconds between two polls of the exports in the watch stage (default: 60)')
+    parser.add_argument('--once', action='store_true', help='poll the exports only once in the watch stage')
+    parser.add_argument('--rasterize', action='store_true',
+                        help='draw the 3D surfaces and the error bars of the lines as images, smaller and faster PDFs')
+    parser.add_argument('--precision', type=float, default=0.01,
+                        help='largest half-width of the confidence intervals of the means among seeds in the seeds stage (default: 0.01)')
+    parser.add_argument('--relative', action='store_true', help='the precision of the seeds stage is relative to the means')
+    parser.add_argument('--variables', nargs='+', default=seedsVariables, metavar='VARIABLE',
+                        help='variables whose means the seeds stage analyses, all in the unit of --precision unless --relative'
+                             ' (default: ' + ' '.join(seedsVariables) + ')')
+    parser.add_argument('--confidence', type=float, default=0.95, help='confidence level of the intervals of the seeds stage (default: 0.95)')
+    parser.add_argument('--profile', action='store_true',
+                        help='save cProfile statistics of the stage reading the exports to ' + datasetOutput + '_ingest.prof'
+                             ' (only this process, use it with --workers 1)')
+    args = parser.parse_args(argv)
+    np.set_printoptions(formatter={'float': floatPrecision.format})
+    report = RunReport(sys.argv[:1] + (sys.argv[1:] if argv is None else list(argv)))
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+    if args.stage == 'convert':
+        convert(args, report)
+    if args.stage == 'partial':
+        partialStage(args, report)
+    if args.stage == 'merge':
+        if not args.partials:
+            parser.error('merge needs the partial summaries to merge')
+        merge(args, report)
+    if args.stage == 'seeds':
+        seeds(args, report)
+    if args.stage == 'watch':
+        if minTime is None or maxTime is None:
+            parser.error('watch needs minTime and maxTime, the exports are not complete')
+        try:
+            watch(args, report)
+        except KeyboardInterrupt:
+            pass
+    if args.stage in ('ingest', 'all') and not args.streaming and not args.exact:
+        if args.profile:
+            profiler.runcall(ingest, args, report)
+        else:
+            ingest(args, report)
+    if args.stage in ('reduce', 'all'):
+        if args.profile and (args.streaming or args.exact):
+            profiler.runcall(reduce, args, report)
+        else:
+            reduce(args, report)
+    if args.stage in ('charts', 'all'):
+        charts(args, report)
+    if args.profile:
+        profiler.dump_stats(datasetOutput + '_ingest.prof')
+        print('profile saved to ' + datasetOutput + '_ingest.prof, see python -m pstats ' + datasetOutput + '_ingest.prof')
+    if report.stages:
+        report.save(datasetOutput + '_report.json')
+        print(report.summary())
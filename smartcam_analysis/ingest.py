@@ -0,0 +1,878 @@
+"""
+Reading of the Alchemist exports: parsing of the headers and of the data, and
+resampling onto a common timeline.
+"""
+import numpy as np
+import codecs
+import fnmatch
+import gzip
+import hashlib
+import io
+import json
+import lzma
+import os
+import re
+import tarfile
+import time
+import warnings
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+try:
+    import zstandard
+except ImportError: # only needed to read .zst files
+    zstandard = None
+
+def distance(val, ref):
+    return abs(ref - val)
+vectDistance = np.vectorize(distance)
+
+def getClosest(sortedMatrix, column, val):
+    while len(sortedMatrix) > 3:
+        half = int(len(sortedMatrix) / 2)
+        sortedMatrix = sortedMatrix[-half - 1:] if sortedMatrix[half, column] < val else sortedMatrix[: half + 1]
+    if len(sortedMatrix) == 1:
+        result = sortedMatrix[0].copy()
+        result[column] = val
+        return result
+    else:
+        safecopy = sortedMatrix.copy()
+        safecopy[:, column] = vectDistance(safecopy[:, column], val)
+        minidx = np.argmin(safecopy[:, column])
+        safecopy = safecopy[minidx, :].A1
+        safecopy[column] = val
+        return safecopy
+
+def convert(column, samples, matrix):
+    return np.matrix([getClosest(matrix, column, t) for t in samples])
+
+resampleModes = ('nearest', 'previous', 'linear')
+
+def resample(column, samples, data, mode='nearest'):
+    """
+    Aligns all the rows of an Alchemist export onto a timeline in a single pass.
+
+    Parameters
+    ----------
+    column : int
+        index of the time column, must be sorted in ascending order
+    samples : array_like
+        the timeline to resample onto
+    data : ndarray
+        a 2D matrix with the values of the export
+    mode : str
+        'nearest' picks the closest row (ties go to the earlier one, as
+        convert() does when the times are strictly increasing), 'previous'
+        picks the last row not after the sample, 'linear' interpolates
+        between the two surrounding rows. Among rows sharing the same time,
+        'nearest' and 'previous' take the first one, while the row convert()
+        takes depends on the path of its bisection
+
+    Returns
+    -------
+    ndarray
+        A matrix with one row per sample, whose time column holds the samples
+
+    """
+    if mode not in resampleModes:
+        raise ValueError('Unknown resample mode ' + str(mode) + ', expected one of ' + str(resampleModes))
+    data = np.asarray(data, dtype=float)
+    samples = np.asarray(samples, dtype=float)
+    times = data[:, column]
+    last = len(times) - 1
+    upper = np.searchsorted(times, samples, side='left').clip(0, last)
+    lower = (upper - 1).clip(0, last)
+    if mode == 'linear':
+        span = times[upper] - times[lower]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weight = np.where(span > 0, (samples - times[lower]) / span, 0.0).clip(0, 1)[:, np.newaxis]
+        result = data[lower] + weight * (data[upper] - data[lower])
+        # do not let a NaN in a neighbour leak into samples landing exactly on a row
+        result = np.where(weight == 0, data[lower], np.where(weight == 1, data[upper], result))
+    else:
+        if mode == 'nearest':
+            useLower = samples - times[lower] <= times[upper] - samples
+        else:
+            useLower = times[upper] > samples
+        chosen = np.where(useLower, lower, upper)
+        # among rows sharing the same time, take the first one
+        chosen = np.searchsorted(times, times[chosen], side='left')
+        result = data[chosen]
+    result[:, column] = samples
+    return result
+
+def valueOrEmptySet(k, d):
+    return (d[k] if isinstance(d[k], set) else {d[k]}) if k in d else set()
+
+def mergeDicts(d1, d2):
+    """
+    Creates a new dictionary whose keys are the union of the keys of two
+    dictionaries, and whose values are the union of values.
+
+    Parameters
+    ----------
+    d1: dict
+        dictionary whose values are sets
+    d2: dict
+        dictionary whose values are sets
+
+    Returns
+    -------
+    dict
+        A dict whose keys are the union of the keys of two dictionaries,
+    and whose values are the union of values
+
+    """
+    res = {}
+    for k in d1.keys() | d2.keys():
+        res[k] = valueOrEmptySet(k, d1) | valueOrEmptySet(k, d2)
+    return res
+
+def is_float(string):
+    try:
+        float(string)
+        return True
+    except ValueError:
+        return False
+
+coordinatesRegex = re.compile(' (?P<varName>[a-zA-Z]+) = (?P<varValue>(?:[-+]?\d*\.?\d+(?:[eE][-+]?\d+)?)|[a-zA-Z-_]*)?')
+namesRegex = re.compile(' (?P<varName>\S+)')
+dataBegin = re.compile('\d')
+
+def parseCoordinates(match):
+    return {var : (float(value) if is_float(value) else value) for var, value in match}
+
+def extractCoordinates(filename):
+    """
+    Scans the header of an Alchemist file in search of the variables.
+
+    Parameters
+    ----------
+    filename : str
+        path to the target file
+    mergewith : dict
+        a dictionary whose dimensions will be merged with the returned one
+
+    Returns
+    -------
+    dict
+        A dictionary whose keys are strings (coordinate name) and values are
+        lists (set of variable values)
+
+    """
+    with open(filename, 'r') as file:
+        for line in file:
+            match = coordinatesRegex.findall(line)
+            if match:
+                return parseCoordinates(match)
+            elif dataBegin.match(line[0]):
+                return {}
+
+def extractVariableNames(filename):
+    """
+    Gets the variable names from the Alchemist data files header.
+
+    Parameters
+    ----------
+    filename : str
+        path to the target file
+
+    Returns
+    -------
+    list of list
+        A matrix with the values of the csv file
+
+    """
+    with open(filename, 'r') as file:
+        lastHeaderLine = ''
+        for line in file:
+            if dataBegin.match(line[0]):
+                break
+            else:
+                lastHeaderLine = line
+        if lastHeaderLine:
+            return namesRegex.findall(lastHeaderLine)
+        return []
+
+def openCsv(path):
+    """
+    Converts an Alchemist export file into a list of lists representing the matrix of values.
+
+    Parameters
+    ----------
+    path : str
+        path to the target file
+
+    Returns
+    -------
+    list of list
+        A matrix with the values of the csv file
+
+    """
+    with open(path, 'r') as file:
+        lines = filter(lambda x: dataBegin.match(x[0]), file.readlines())
+        return [[float(x) for x in line.split()] for line in lines]
+
+Export = namedtuple('Export', ['coordinates', 'names', 'data', 'rows'], defaults=(None,))
+
+def splitHeader(text):
+    """
+    Scans the header of the content of an Alchemist export file.
+
+    Parameters
+    ----------
+    text : str
+        the whole content of the file
+
+    Returns
+    -------
+    tuple
+        The coordinates (as extractCoordinates()), the column names
+        (as extractVariableNames()) and the offset of the first line of values
+
+    """
+    coordinates = None
+    lastHeaderLine = ''
+    start = 0
+    while start < len(text) and not dataBegin.match(text[start]):
+        end = text.find('\n', start)
+        end = len(text) if end < 0 else end + 1
+        line = text[start:end]
+        if coordinates is None:
+            match = coordinatesRegex.findall(line)
+            if match:
+                coordinates = parseCoordinates(match)
+        lastHeaderLine = line
+        start = end
+    names = namesRegex.findall(lastHeaderLine) if lastHeaderLine else []
+    return coordinates or {}, names, start
+
+def parseExport(text):
+    """
+    Parses the content of an Alchemist export file, header and values at once.
+
+    Parameters
+    ----------
+    text : str
+        the whole content of the file
+
+    Returns
+    -------
+    Export
+        The coordinates found in the header (as extractCoordinates()), the
+        column names (as extractVariableNames()) and a contiguous float64
+        matrix with the values (as openCsv())
+
+    """
+    coordinates, names, start = splitHeader(text)
+    # the values go on until the footer, which is made of comments
+    stop = text.find('\n#', start)
+    block = text[start:] if stop < 0 else text[start:stop]
+    columns = len(block.split('\n', 1)[0].split())
+    if not columns:
+        return Export(coordinates, names, np.empty((0, len(names))))
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', DeprecationWarning)
+            data = np.fromstring(block, sep=' ')
+        data = data.reshape(-1, columns)
+    except ValueError:
+        # something unexpected among the values, filter line by line as openCsv() does
+        lines = filter(lambda x: x and dataBegin.match(x[0]), text[start:].splitlines())
+        data = np.array([[float(x) for x in line.split()] for line in lines], dtype=float).reshape(-1, columns)
+    return Export(coordinates, names, data)
+
+compressionSuffixes = ('.gz', '.xz', '.zst')
+archiveSuffixes = ('.tar', '.tar.gz', '.tgz', '.tar.xz', '.tar.zst')
+memberSeparator = '::' # archive::member is the path of an export inside a tar archive
+
+def openCompressed(path, content=None):
+    """
+    Opens a file for reading, decompressing it on the fly if its suffix is one
+    of compressionSuffixes (or .tgz).
+
+    Parameters
+    ----------
+    path : str
+        the file
+    content : bytes
+        the raw content of the file if it was already read, then path only
+        tells how it is compressed
+
+    Returns
+    -------
+    file
+        A binary stream of the decompressed content
+    """
+    source = path if content is None else io.BytesIO(content)
+    if path.endswith(('.gz', '.tgz')):
+        return gzip.open(source, 'rb')
+    if path.endswith('.xz'):
+        return lzma.open(source, 'rb')
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise ImportError('reading ' + path + ' requires the zstandard package')
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb') if content is None else source, closefd=True)
+    return open(path, 'rb') if content is None else source
+
+def iterArchive(path, pattern='*'):
+    """
+    Goes through a tar archive once, in the order of its members, without
+    extracting it.
+
+    Parameters
+    ----------
+    path : str
+        the archive, compressed or not
+    pattern : str
+        only the members whose file name matches it are yielded
+
+    Yields
+    ------
+    tuple
+        The name of each member and a binary stream of its content, valid
+        until the next member
+    """
+    with openCompressed(path) as stream, tarfile.open(fileobj=stream, mode='r|') as archive:
+        for member in archive:
+            if member.isfile() and fnmatch.fnmatch(os.path.basename(member.name), pattern):
+                yield member.name, archive.extractfile(member)
+
+def archiveMembers(path, pattern='*'):
+    """
+    Lists the members of a tar archive whose file name matches pattern.
+    """
+    return [name for name, content in iterArchive(path, pattern)]
+
+# Position of the archives being read by this process, with the modification
+# time and size they had when opened: the exports of an archive are usually
+# read in its order, and then it is decompressed only once
+archiveCursors = {}
+# Raw content of the files read by a ReadAhead and not yet parsed
+prefetched = {}
+
+def readText(path):
+    """
+    Reads the whole content of a file, decompressed, or of a member of a tar
+    archive if path is archive::member.
+    """
+    archive, separator, member = path.partition(memberSeparator)
+    if not separator:
+        with io.TextIOWrapper(openCompressed(path, prefetched.pop(path, None))) as file:
+            return file.read()
+    status = os.stat(archive)
+    signature = (status.st_mtime_ns, status.st_size)
+    opened, cursor, seen = archiveCursors.pop(archive, (signature, None, set()))
+    if member in seen or opened != signature:
+        # going back, or the archive was written again since it was opened
+        closeCursor(cursor)
+        cursor = None
+    for attempt in range(2):
+        if cursor is None:
+            cursor, seen = iterArchive(archive), set()
+        try:
+            for name, content in cursor:
+                seen.add(name)
+                if name == member:
+                    text = io.TextIOWrapper(io.BytesIO(content.read())).read()
+                    archiveCursors[archive] = (signature, cursor, seen)
+                    return text
+        except BaseException:
+            closeCursor(cursor)
+            raise
+        # the whole archive was read, iterArchive() closed it
+        cursor = None
+    raise FileNotFoundError(member + ' is not in ' + archive)
+
+def closeCursor(cursor):
+    """
+    Closes the archive an iterArchive() generator is going through, if any.
+    """
+    if cursor is not None:
+        cursor.close()
+
+def closeArchives():
+    """
+    Closes the archives kept open by readText() in this process.
+    """
+    while archiveCursors:
+        closeCursor(archiveCursors.popitem()[1][1])
+
+def readExport(path):
+    """
+    Reads an Alchemist export file, opening it only once.
+
+    Parameters
+    ----------
+    path : str
+        path to the target file, see readText(), or to its columnar copy
+        (.npy) written by convertExport()
+
+    Returns
+    -------
+    Export
+        See parseExport()
+
+    """
+    if path.endswith('.npy'):
+        return readColumnar(path)
+    return parseExport(readText(path))
+
+def columnarPath(storeDir, path):
+    """
+    Where convertExport() writes the copy of an export.
+    """
+    return os.path.join(storeDir, hashlib.sha1(path.encode()).hexdigest() + '.npy')
+
+def convertExport(path, storeDir):
+    """
+    Writes the columnar copy of an Alchemist export file: the values in
+    column-major order as .npy, each column contiguous on disk, and the
+    header in a .json file next to it.
+    It is the unit of work of the convert stage, so it must stay picklable.
+
+    Parameters
+    ----------
+    path : str
+        path to the export, see readText()
+    storeDir : str
+        directory of the copies, created if needed, see columnarPath()
+
+    Returns
+    -------
+    int
+        The number of rows
+    """
+    export = readExport(path)
+    target = columnarPath(storeDir, path)
+    os.makedirs(storeDir, exist_ok=True)
+    with open(target + '.tmp', 'wb') as file:
+        np.save(file, np.asfortranarray(export.data))
+    with open(target[:-4] + '.json.tmp', 'w') as file:
+        json.dump({'source': path, 'coordinates': export.coordinates, 'names': export.names}, file)
+    os.replace(target[:-4] + '.json.tmp', target[:-4] + '.json')
+    os.replace(target + '.tmp', target)
+    return len(export.data)
+
+def readColumnar(path):
+    """
+    Reads the copy of an export written by convertExport(), mapping the
+    values in memory instead of reading them.
+
+    Returns
+    -------
+    Export
+        See parseExport(), data is a read-only numpy.memmap
+    """
+    with open(path[:-4] + '.json') as file:
+        header = json.load(file)
+    return Export(header['coordinates'], header['names'], np.load(path, mmap_mode='r'))
+
+def scanExport(path, timeColumnName='time'):
+    """
+    Reads what describes an Alchemist export file without parsing its values.
+
+    Parameters
+    ----------
+    path : str
+        path to the target file
+    timeColumnName : str
+        name of the time column
+
+    Returns
+    -------
+    tuple
+        The coordinates in the header, the number of rows and the first and
+        last time, NaN if the file has no values
+
+    """
+    text = readText(path)
+    coordinates, names, start = splitHeader(text)
+    stop = text.find('\n#', start)
+    block = (text[start:] if stop < 0 else text[start:stop]).strip()
+    if not block:
+        return coordinates, 0, float('nan'), float('nan')
+    column = names.index(timeColumnName)
+    first = block.split('\n', 1)[0]
+    last = block.rsplit('\n', 1)[-1]
+    return coordinates, block.count('\n') + 1, float(first.split()[column]), float(last.split()[column])
+
+def scanStream(stream, timeColumnName='time', chunk=2 ** 16):
+    """
+    Reads the header of an Alchemist export and the time of its first row
+    from a binary stream, stopping there.
+
+    Returns
+    -------
+    tuple
+        The coordinates in the header, the column names and the first time,
+        None if the export has no values
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    text = ''
+    while True:
+        block = stream.read(chunk)
+        text += decoder.decode(block, final=not block)
+        coordinates, names, start = splitHeader(text)
+        end = text.find('\n', start)
+        if start < len(text) and (end >= 0 or not block):
+            return coordinates, names, float(text[start:end if end >= 0 else None].split()[names.index(timeColumnName)])
+        if not block:
+            return coordinates, names, None
+
+def lastTime(path, column, chunk=2 ** 16):
+    """
+    The time of the last row of a plain Alchemist export, from the end of the
+    file only, NaN if it is not there.
+    """
+    with open(path, 'rb') as file:
+        size = file.seek(0, os.SEEK_END)
+        file.seek(max(0, size - chunk))
+        lines = file.read().decode(errors='replace').split('\n')
+    # the first line can be cut, unless the file starts there
+    for line in reversed(lines if size <= chunk else lines[1:]):
+        if line and dataBegin.match(line[0]):
+            return float(line.split()[column])
+    return float('nan')
+
+def scanHeader(path, timeColumnName='time'):
+    """
+    Reads what describes an Alchemist export file without reading its values:
+    its header and first row, and the last row from the end of the file for
+    plain files. The members of tar archives are read in full, as
+    scanExport() does (Catalog scans them while listing their archive).
+
+    Returns
+    -------
+    tuple
+        As scanExport(), but the number of rows is None and the last time NaN
+        if they are not known without reading all the values
+    """
+    if memberSeparator in path:
+        return scanExport(path, timeColumnName)
+    with openCompressed(path) as stream:
+        coordinates, names, first = scanStream(stream, timeColumnName)
+    if first is None:
+        return coordinates, 0, float('nan'), float('nan')
+    last = float('nan') if path.endswith(compressionSuffixes) else lastTime(path, names.index(timeColumnName))
+    return coordinates, None, first, last
+
+def ingestExport(path, timeColumnName, timeline, mode='nearest'):
+    """
+    Reads an Alchemist export file and resamples it onto the timeline.
+    It is the unit of work of ingestFiles(), so it must stay picklable.
+
+    Parameters
+    ----------
+    path : str
+        path to the target file
+    timeColumnName : str
+        name of the time column
+    timeline : ndarray
+        the timeline to resample onto
+    mode : str
+        see resample()
+
+    Returns
+    -------
+    Export
+        The coordinates of the file, the names of the columns other than
+        time, a (len(timeline), len(names)) matrix with their values and the
+        number of rows in the file
+
+    """
+    return resampleExport(readExport(path), timeColumnName, timeline, mode)
+
+def resampleExport(export, timeColumnName, timeline, mode='nearest'):
+    """
+    Resamples the values of a read export onto the timeline, see ingestExport().
+    """
+    timeColumn = export.names.index(timeColumnName)
+    data = resample(timeColumn, timeline, export.data, mode)
+    names = [v for v in export.names if v != timeColumnName]
+    return Export(export.coordinates, names, np.delete(data, timeColumn, axis=1), len(export.data))
+
+class ExportTail:
+    """
+    An export that Alchemist is still writing: each poll() parses only the
+    lines appended since the previous one, starting from the byte offset
+    where it stopped. It can be pickled to go on after a restart.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.header = '' # the text before the values, parsed again with each new block
+        self.coordinates = None
+        self.names = None
+        self.blocks = []
+        self.ended = False # the footer was written
+
+    def poll(self):
+        """
+        Reads the complete lines appended since the last call.
+
+        Returns
+        -------
+        int
+            The number of new rows
+        """
+        if self.ended:
+            return 0
+        with open(self.path, 'rb') as file:
+            file.seek(self.offset)
+            chunk = file.read()
+        end = chunk.rfind(b'\n') + 1
+        if not end:
+            return 0
+        self.offset += end
+        text = chunk[:end].decode()
+        if self.names is None:
+            # the values have not started yet, wait for the whole header
+            text = self.header + text
+            coordinates, names, start = splitHeader(text)
+            if start >= len(text):
+                self.header = text
+                return 0
+            self.header, text = text[:start], text[start:]
+            self.coordinates, self.names = coordinates, names
+        footer = text.find('#')
+        if footer >= 0:
+            self.ended = True
+            text = text[:footer]
+        if not text.strip():
+            return 0
+        self.blocks.append(parseExport(self.header + text).data)
+        return len(self.blocks[-1])
+
+    def lastTime(self, timeColumnName='time'):
+        """
+        The time of the last row read, NaN if none was.
+        """
+        if not self.blocks:
+            return float('nan')
+        return self.blocks[-1][-1, self.names.index(timeColumnName)]
+
+    def export(self):
+        """
+        Returns
+        -------
+        Export
+            The rows read so far, as readExport() would read them
+        """
+        data = np.concatenate(self.blocks) if self.blocks else np.empty((0, len(self.names or [])))
+        return Export(self.coordinates or {}, self.names or [], data, len(data))
+
+def ingestFiles(files, timeColumnName, timeline, mode='nearest', workers=1):
+    """
+    Reads and resamples many Alchemist export files, optionally with a pool of processes.
+
+    Parameters
+    ----------
+    files : list of str
+        paths to the target files
+    timeColumnName : str
+        name of the time column
+    timeline : ndarray
+        the timeline to resample onto
+    mode : str
+        see resample()
+    workers : int
+        number of processes, 1 reads in this process, 0 uses all the cores
+
+    Returns
+    -------
+    list of Export
+        The result of ingestExport() for each file, in the same order of files
+
+    """
+    return list(iterIngest(files, timeColumnName, timeline, mode, workers))
+
+def iterIngest(files, timeColumnName, timeline, mode='nearest', workers=1, readAhead=None):
+    """
+    Same as ingestFiles(), but yields the results one at a time, in order,
+    reading the next files with readAhead if given (see mapFiles()).
+    """
+    return mapFiles(partial(ingestExport, timeColumnName=timeColumnName, timeline=timeline, mode=mode), files, workers, readAhead)
+
+def readRaw(path):
+    """
+    The raw content of a file in a single read, and the seconds it took.
+    """
+    start = time.perf_counter()
+    with open(path, 'rb') as file:
+        content = file.read()
+    return content, time.perf_counter() - start
+
+class ReadAhead:
+    """
+    Reads the raw content of the next files with a few threads while this
+    process parses the current one, so that the time spent waiting for the
+    disk overlaps with the parsing. The files read and not yet parsed take
+    at most memoryCap bytes, one file at a time if it is larger.
+
+    Only whole files are read ahead: the members of tar archives are read
+    in the order of their archive and the columnar copies are mapped, both
+    by load itself. The counters add up over the calls of map().
+    """
+
+    def __init__(self, threads=2, memoryCap=256 * 2 ** 20):
+        """
+        Parameters
+        ----------
+        threads : int
+            number of threads reading the files
+        memoryCap : int
+            maximum bytes read ahead and not yet parsed
+
+        """
+        self.threads = threads
+        self.memoryCap = memoryCap
+        self.files = self.bytes = self.peakBytes = 0
+        self.readSeconds = self.waitSeconds = self.computeSeconds = 0.0
+
+    def map(self, load, files):
+        """
+        Yields load(file) for each file, in order, as map() does. load must
+        read the file with readText().
+        """
+        sizes = [0 if memberSeparator in file or file.endswith('.npy') else os.path.getsize(file) for file in files]
+        pending = {}
+        buffered = ahead = 0
+        pool = ThreadPoolExecutor(self.threads)
+        try:
+            for index, file in enumerate(files):
+                while ahead < len(files) and (ahead <= index or buffered + sizes[ahead] <= self.memoryCap):
+                    if sizes[ahead]:
+                        pending[ahead] = pool.submit(readRaw, files[ahead])
+                        buffered += sizes[ahead]
+                    ahead += 1
+                self.peakBytes = max(self.peakBytes, buffered)
+                if index in pending:
+                    start = time.perf_counter()
+                    content, seconds = pending.pop(index).result()
+                    self.waitSeconds += time.perf_counter() - start
+                    self.readSeconds += seconds
+                    self.bytes += len(content)
+                    buffered -= sizes[index]
+                    prefetched[file] = content
+                    del content
+                start = time.perf_counter()
+                try:
+                    result = load(file)
+                finally:
+                    prefetched.pop(file, None)
+                self.computeSeconds += time.perf_counter() - start
+                self.files += 1
+                yield result
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    def metrics(self):
+        """
+        The files and MB read ahead, the seconds the threads spent reading
+        them, the seconds spent waiting for them and parsing them, and the
+        share of the reading hidden behind the parsing (readOverlap).
+        """
+        return {'readAheadFiles': self.files, 'readAheadMB': self.bytes / 2 ** 20, 'readAheadPeakMB': self.peakBytes / 2 ** 20,
+                'readSeconds': self.readSeconds, 'readWaitSeconds': self.waitSeconds, 'parseSeconds': self.computeSeconds,
+                'readOverlap': max(0.0, 1 - self.waitSeconds / self.readSeconds) if self.readSeconds > 0 else float('nan')}
+
+def mapFiles(load, files, workers=1, readAhead=None):
+    """
+    Yields load(file) for each file, in order, optionally computed by a pool
+    of processes: load must be picklable and its results should be small.
+    In this process, a ReadAhead reads the next files while load runs; each
+    process of a pool reads its own files, and they already overlap. The
+    archives read in this process are closed once all the files are done.
+    """
+    workers = workers or os.cpu_count()
+    if workers <= 1 or len(files) <= 1:
+        try:
+            yield from map(load, files) if readAhead is None else readAhead.map(load, files)
+        finally:
+            closeArchives()
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        yield from pool.map(load, files, chunksize=max(1, len(files) // (workers * 4)))
+
+integrationModes = ('step', 'trapezoid')
+
+def integrate(column, data, mode='step', window=None):
+    """
+    Time-weighted means and totals of all the columns of an Alchemist export,
+    from its rows, in a single pass.
+
+    Parameters
+    ----------
+    column : int
+        index of the time column, must be sorted in ascending order
+    data : ndarray
+        a 2D matrix with the values of the export
+    mode : str
+        'step' holds each value until the next row, as the simulator does
+        between two exports, 'trapezoid' interpolates linearly between rows
+    window : tuple
+        first and last time to consider, None to use all the rows
+
+    Returns
+    -------
+    tuple of ndarray
+        The means, integral over time divided by the time covered by valid
+        values (the plain mean for a single row), and the sums of the values
+        of the rows, NaN for columns without values
+
+    """
+    if mode not in integrationModes:
+        raise ValueError('Unknown integration mode ' + str(mode) + ', expected one of ' + str(integrationModes))
+    data = np.asarray(data, dtype=float)
+    if window is not None:
+        data = data[(data[:, column] >= window[0]) & (data[:, column] <= window[1])]
+    durations = np.diff(data[:, column])[:, np.newaxis]
+    values = data[:-1] if mode == 'step' else (data[:-1] + data[1:]) / 2
+    valid = ~np.isnan(values)
+    covered = np.where(valid, durations, 0).sum(axis=0)
+    integral = np.where(valid, values * durations, 0).sum(axis=0)
+    empty = np.isnan(data).all(axis=0)
+    with warnings.catch_warnings(), np.errstate(divide='ignore', invalid='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning) # all-NaN columns are expected
+        means = np.where(covered > 0, integral / covered, np.nanmean(data, axis=0))
+    sums = np.where(empty, float('nan'), np.nansum(data, axis=0))
+    return means, sums
+
+ExportSummary = namedtuple('ExportSummary', ['coordinates', 'names', 'means', 'sums', 'data', 'rows'])
+ExportSummary.__doc__ = """
+What the reductions need from an export: its coordinates, the names of the
+columns other than time, their time-weighted means and totals (see
+integrate()), the values resampled onto a timeline (None if not asked) and
+the number of rows in the file.
+"""
+
+def summarizeExport(path, timeColumnName, mode='step', window=None, timeline=None, resampleMode='nearest'):
+    """
+    Reads an Alchemist export file and integrates its rows, resampling them
+    only if a timeline is given. It is the unit of work of iterSummaries(),
+    so it must stay picklable.
+
+    Returns
+    -------
+    ExportSummary
+        See integrate() for mode and window, resample() for resampleMode
+    """
+    export = readExport(path)
+    timeColumn = export.names.index(timeColumnName)
+    names = [v for v in export.names if v != timeColumnName]
+    means, sums = integrate(timeColumn, export.data, mode, window)
+    data = None
+    if timeline is not None:
+        data = np.delete(resample(timeColumn, timeline, export.data, resampleMode), timeColumn, axis=1)
+    return ExportSummary(export.coordinates, names, np.delete(means, timeColumn), np.delete(sums, timeColumn), data, len(export.data))
+
+def iterSummaries(files, timeColumnName, mode='step', window=None, timeline=None, resampleMode='nearest', workers=1, readAhead=None):
+    """
+    Yields summarizeExport() of each file, one at a time and in order,
+    optionally with a pool of processes or reading ahead (see mapFiles()).
+    """
+    return mapFiles(partial(summarizeExport, timeColumnName=timeColumnName, mode=mode, window=window,
+                            timeline=timeline, resampleMode=resampleMode), files, workers, readAhead)
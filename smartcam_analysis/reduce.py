@@ -0,0 +1,660 @@
+"""
+Summaries of the experiments, as used by the charts: from a full dataset, or
+folded one export at a time.
+"""
+import itertools
+import math
+import numpy as np
+import warnings
+from collections import namedtuple
+from statistics import NormalDist
+
+Reductions = namedtuple('Reductions', ['timeMean', 'timeMeanStd', 'timeSum', 'timeSumStd', 'inTime'])
+Reductions.__doc__ = """
+The summaries the charts are drawn from, each one an xarray.Dataset over the
+experiment variables other than the seeds: mean and standard deviation among
+seeds of the time mean and of the time sum of each variable (plus the ratios
+between sums), and mean among seeds at each instant of the timeline.
+They are either laid out over the experiment variables, or keyed by cellDim
+with one row per combination of the variables that was run (see densify()).
+"""
+# Dimension of the ingested exports stored one row per export (see
+# spliceRuns()), and of the summaries stored one row per combination of the
+# experiment variables: the variables are coordinates along it
+runDim = 'run'
+cellDim = 'cell'
+
+def reduceDataset(dataset, seedVars, timeColumnName, ratios={}):
+    """
+    Computes the Reductions of a full dataset, as built by spliceExports().
+
+    Parameters
+    ----------
+    dataset : xarray.Dataset
+        the dataset, possibly lazily loaded
+    seedVars : list of str
+        the dimensions to fold
+    timeColumnName : str
+        name of the time dimension
+    ratios : dict
+        new variables to compute from the sums, name: (numerator, denominator)
+
+    Returns
+    -------
+    Reductions
+        The summaries of the dataset
+
+    """
+    import dask
+    # With a lazy dataset, this reads the file once. Missing files must not count as a zero sum
+    dataMean, dataSum, inTime = dask.compute(dataset.mean(timeColumnName), dataset.sum(timeColumnName, min_count=1), dataset.mean(seedVars))
+    dataSum = dataSum.assign({k: dataSum[num] / dataSum[den] for k, (num, den) in ratios.items()})
+    return Reductions(dataMean.mean(seedVars), dataMean.std(seedVars), dataSum.mean(seedVars), dataSum.std(seedVars), inTime)
+
+def reduceRuns(dataset, seedVars, timeColumnName, ratios={}, block=256):
+    """
+    Computes the Reductions of a dataset stored one row per export, as built
+    by spliceRuns(), without laying it out over the experiment variables:
+    the summaries are keyed by cellDim, one row per combination of the
+    variables other than seedVars that has exports. The rows are read once,
+    a block at a time.
+
+    Parameters
+    ----------
+    dataset, seedVars, timeColumnName, ratios : see reduceDataset()
+    block : int
+        number of rows read at once
+
+    Returns
+    -------
+    Reductions
+        The summaries, with the same values as reduceDataset() gives for the
+        dense dataset on the combinations that have exports
+    """
+    import xarray as xr
+    variables = [k for k, v in dataset.coords.items() if v.dims == (runDim,) and k not in seedVars]
+    keys = list(zip(*[dataset[k].values.tolist() for k in variables]))
+    cells = sorted(set(keys))
+    position = {key: i for i, key in enumerate(cells)}
+    codes = np.array([position[key] for key in keys], dtype=np.int64)
+    names = list(dataset.data_vars)
+    samples = dataset.sizes[timeColumnName]
+    means = np.full((len(keys), len(names)), float('nan'))
+    sums = np.full((len(keys), len(names)), float('nan'))
+    timeSum = np.zeros((len(cells), samples, len(names)))
+    timeCount = np.zeros((len(cells), samples, len(names)), dtype=np.int64)
+    for start in range(0, len(keys), block):
+        rows = slice(start, start + block)
+        values = np.stack([dataset[v].isel({runDim: rows}).transpose(runDim, timeColumnName).values for v in names], axis=-1).astype(float)
+        valid = ~np.isnan(values)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning) # exports without values are expected
+            means[rows] = np.nanmean(values, axis=1)
+        # Missing values must not count as a zero sum
+        sums[rows] = np.where(valid.any(axis=1), np.nansum(values, axis=1), float('nan'))
+        # rows of the block by cells, the values of each cell are summed by a product
+        members = (codes[rows] == np.arange(len(cells))[:, np.newaxis]).astype(float)
+        timeSum += (members @ np.where(valid, values, 0).reshape(len(values), -1)).reshape(timeSum.shape)
+        timeCount += (members @ valid.reshape(len(values), -1)).reshape(timeCount.shape).astype(np.int64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sums = np.concatenate([sums] + [sums[:, [names.index(num)]] / sums[:, [names.index(den)]] for num, den in ratios.values()], axis=1)
+        def byCell(values):
+            # mean and population standard deviation among the rows of each cell, NaN skipped
+            valid = ~np.isnan(values)
+            count = np.zeros((len(cells),) + values.shape[1:])
+            total = np.zeros((len(cells),) + values.shape[1:])
+            np.add.at(count, codes, valid)
+            np.add.at(total, codes, np.where(valid, values, 0))
+            mean = np.where(count > 0, total / count, float('nan'))
+            squares = np.zeros((len(cells),) + values.shape[1:])
+            np.add.at(squares, codes, np.where(valid, values - mean[codes], 0) ** 2)
+            return mean, np.where(count > 0, np.sqrt(squares / count), float('nan'))
+        timeMean, timeMeanStd = byCell(means)
+        timeTotal, timeTotalStd = byCell(sums)
+        inTime = np.where(timeCount > 0, timeSum / timeCount, float('nan'))
+    coords = {k: (cellDim, [cell[i] for cell in cells]) for i, k in enumerate(variables)}
+    coords[cellDim] = np.arange(len(cells))
+    summary = lambda values, names: xr.Dataset({v: (cellDim, values[:, i]) for i, v in enumerate(names)}, coords=coords)
+    sumNames = names + list(ratios)
+    inTime = xr.Dataset({v: ((cellDim, timeColumnName), inTime[..., i]) for i, v in enumerate(names)}, coords=coords)
+    inTime.coords[timeColumnName] = dataset[timeColumnName].values
+    return Reductions(summary(timeMean, names), summary(timeMeanStd, names), summary(timeTotal, sumNames), summary(timeTotalStd, sumNames), inTime)
+
+def densify(dataset, dim, **selection):
+    """
+    Lays out over the experiment variables the rows of a dataset keyed by
+    dim, runDim or cellDim, that match a selection: only the selected part
+    is made dense, the combinations without a row are NaN. A dataset that is
+    already dense is only selected.
+
+    Parameters
+    ----------
+    dataset : xarray.Dataset
+        the rows, with the experiment variables as coordinates along dim
+    dim : str
+        the dimension of the rows
+    selection : dict
+        variable: value, to drop the variable, or variable: list of values,
+        to keep them in the given order, as in xarray.Dataset.sel()
+
+    Returns
+    -------
+    xarray.Dataset
+        The selected values, one dimension per experiment variable kept
+    """
+    if dim not in dataset.dims:
+        return dataset.sel(selection)
+    keep = np.ones(dataset.sizes[dim], dtype=bool)
+    for k, v in selection.items():
+        keep &= np.isin(dataset[k].values, v if isinstance(v, (list, tuple, np.ndarray)) else [v])
+    rows = dataset.isel({dim: keep})
+    variables = [k for k, v in rows.coords.items() if v.dims == (dim,) and k != dim]
+    dense = rows.drop_vars([dim] if dim in rows.coords else []).set_index({dim: variables}).unstack(dim)
+    lists = {k: v for k, v in selection.items() if isinstance(v, (list, tuple, np.ndarray))}
+    return dense.reindex(lists).sel({k: v for k, v in selection.items() if k not in lists})
+
+def coarsenTime(dataset, timeColumnName, samples):
+    """
+    A coarser copy of the values in time of a dataset, with about samples
+    instants: each one is the mean of as many consecutive instants as needed
+    (the last block can be shorter) and its time is the mean of their times.
+    """
+    factor = max(1, -(-dataset.sizes[timeColumnName] // samples))
+    return dataset.coarsen({timeColumnName: factor}, boundary='pad').mean()
+
+class StreamingSummary:
+    """
+    Folds ingested exports into running Reductions, one file at a time, so that
+    the full dataset never needs to be in memory. Means and standard deviations
+    among seeds are computed with Welford's algorithm, the values in time are
+    kept as sums and counts.
+
+    The means and totals over time of each file can also be computed elsewhere,
+    as the exact ones of ExportSummary, and folded with fold().
+    """
+
+    def __init__(self, seedVars, timeColumnName, timeline, ratios={}):
+        """
+        Parameters
+        ----------
+        seedVars : list of str
+            the experiment variables to fold
+        timeColumnName : str
+            name of the time dimension
+        timeline : ndarray
+            the timeline the exports were resampled onto
+        ratios : dict
+            new variables to compute from the sums, name: (numerator, denominator)
+
+        """
+        self.seedVars = seedVars
+        self.timeColumnName = timeColumnName
+        self.timeline = timeline
+        self.ratios = ratios
+        self.names = None
+        self.cells = {}
+
+    def add(self, export):
+        """
+        Folds an ingested export (see ingestExport()) into the summary.
+        """
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning) # all-NaN columns are expected
+            means = np.nanmean(export.data, axis=0)
+        sums = np.where(np.isnan(export.data).all(axis=0), float('nan'), np.nansum(export.data, axis=0))
+        self.fold(export.coordinates, export.names, means, sums, export.data)
+
+    def fold(self, coordinates, names, means, sums, values=None):
+        """
+        Folds the means and totals over time of a file into the summary.
+
+        Parameters
+        ----------
+        coordinates : dict
+            the coordinates of the file
+        names : list of str
+            the names of the columns
+        means, sums : ndarray
+            mean and total over time of each column
+        values : ndarray
+            the values resampled onto the timeline, None to leave the file out
+            of the values in time
+
+        """
+        if self.names is None:
+            self.names = list(names)
+        elif list(names) != self.names:
+            raise ValueError('Expected the columns ' + str(self.names) + ', got ' + str(names))
+        key = tuple((k, v) for k, v in coordinates.items() if k not in self.seedVars)
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = self.newCell()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sums = np.append(sums, [sums[self.names.index(num)] / sums[self.names.index(den)] for num, den in self.ratios.values()])
+        self.foldCell(cell, means, sums, values)
+
+    def newCell(self):
+        """
+        The running statistics of a combination of the experiment variables.
+        """
+        return {
+            'mean': welfordStart(len(self.names)),
+            'sum': welfordStart(len(self.names) + len(self.ratios)),
+            'timeSum': None,
+            'timeCount': None,
+        }
+
+    def foldCell(self, cell, means, sums, values):
+        welfordAdd(cell['mean'], means)
+        welfordAdd(cell['sum'], sums)
+        if values is not None:
+            if cell['timeSum'] is None:
+                cell['timeSum'] = np.zeros((len(self.timeline), len(self.names)))
+                cell['timeCount'] = np.zeros((len(self.timeline), len(self.names)), dtype=np.int64)
+            valid = ~np.isnan(values)
+            cell['timeSum'] += np.where(valid, values, 0)
+            cell['timeCount'] += valid
+
+    def cellMean(self, cell, field):
+        return welfordMean(cell[field])
+
+    def cellStd(self, cell, field):
+        return welfordStd(cell[field])
+
+    def cellTimeMean(self, cell):
+        return np.where(cell['timeCount'] > 0, cell['timeSum'] / cell['timeCount'], float('nan'))
+
+    def reductions(self, cells=False):
+        """
+        Parameters
+        ----------
+        cells : bool
+            key the summaries by cellDim, one row per combination of the
+            experiment variables, instead of laying them out over the variables
+
+        Returns
+        -------
+        Reductions
+            The summaries of the exports added so far, as if reduceDataset()
+            (or reduceRuns() with cells) was called on the dataset containing
+            them. The values in time have no variables if no values were folded
+        """
+        import xarray as xr
+        keys = list(self.cells)
+        dimensions = list(dict.fromkeys(k for key in keys for k, v in key))
+        coords = {d: sorted({v for key in keys for k, v in key if k == d}) for d in dimensions}
+        shape = tuple(len(v) for v in coords.values())
+        index = {d: {v: i for i, v in enumerate(values)} for d, values in coords.items()}
+        if cells:
+            keys = sorted(keys, key=lambda key: tuple(v for k, v in key))
+            shape = (len(keys),)
+            index = {key: i for i, key in enumerate(keys)}
+            coords = {d: (cellDim, [v for key in keys for k, v in key if k == d]) for d in dimensions}
+            coords[cellDim] = np.arange(len(keys))
+        def dense(extract, names, timed=False):
+            values = np.full(shape + ((len(self.timeline),) if timed else ()) + (len(names),), float('nan'))
+            for key, cell in self.cells.items():
+                if not timed or cell['timeSum'] is not None:
+                    values[index[key] if cells else tuple(index[k][v] for k, v in key)] = extract(cell)
+            dims = ([cellDim] if cells else dimensions) + ([self.timeColumnName] if timed else [])
+            dataset = xr.Dataset({v: (dims, values[..., i]) for i, v in enumerate(names)}, coords=coords)
+            if timed:
+                dataset.coords[self.timeColumnName] = self.timeline
+            return dataset
+        sumNames = self.names + list(self.ratios)
+        timedNames = self.names if any(cell['timeSum'] is not None for cell in self.cells.values()) else []
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return Reductions(
+                dense(lambda c: self.cellMean(c, 'mean'), self.names),
+                dense(lambda c: self.cellStd(c, 'mean'), self.names),
+                dense(lambda c: self.cellMean(c, 'sum'), sumNames),
+                dense(lambda c: self.cellStd(c, 'sum'), sumNames),
+                dense(self.cellTimeMean, timedNames, timed=True),
+            )
+
+def welfordStart(size):
+    return {'count': np.zeros(size, dtype=np.int64), 'mean': np.zeros(size), 'm2': np.zeros(size)}
+
+def welfordAdd(state, values):
+    """
+    Updates a running mean and variance with one more value per element, NaNs are skipped.
+    """
+    valid = ~np.isnan(values)
+    state['count'] += valid
+    delta = np.where(valid, values - state['mean'], 0)
+    state['mean'] += np.where(valid, delta / np.maximum(state['count'], 1), 0)
+    state['m2'] += np.where(valid, delta * (values - state['mean']), 0)
+
+def welfordMean(state):
+    return np.where(state['count'] > 0, state['mean'], float('nan'))
+
+def welfordStd(state):
+    # population standard deviation, as xarray's std()
+    return np.where(state['count'] > 0, np.sqrt(state['m2'] / np.maximum(state['count'], 1)), float('nan'))
+
+class PartialSummary(StreamingSummary):
+    """
+    A StreamingSummary of some of the exports, as those of one machine, that
+    can be saved and merged with the ones of the other exports.
+
+    The sums among seeds are kept exactly, as integers (see exactAdd()), so
+    merging gives the same bits in any order, and the same bits as folding
+    all the exports into a single summary.
+    """
+
+    def __init__(self, seedVars, timeColumnName, timeline, ratios={}):
+        super().__init__(seedVars, timeColumnName, timeline, ratios)
+        self.files = set() # the coordinates of the exports folded, seeds included
+
+    def fold(self, coordinates, names, means, sums, values=None):
+        file = tuple(coordinates.items())
+        if file in self.files:
+            raise ValueError('The export ' + str(coordinates) + ' was already folded')
+        super().fold(coordinates, names, means, sums, values)
+        self.files.add(file)
+
+    def newCell(self):
+        return {
+            'mean': exactStart(len(self.names), squares=True),
+            'sum': exactStart(len(self.names) + len(self.ratios), squares=True),
+            'timeSum': None,
+        }
+
+    def foldCell(self, cell, means, sums, values):
+        exactAdd(cell['mean'], means)
+        exactAdd(cell['sum'], sums)
+        if values is not None:
+            if cell['timeSum'] is None:
+                cell['timeSum'] = exactStart((len(self.timeline), len(self.names)))
+            exactAdd(cell['timeSum'], values)
+
+    def cellMean(self, cell, field):
+        return exactMean(cell[field])
+
+    def cellStd(self, cell, field):
+        return exactStd(cell[field])
+
+    def cellTimeMean(self, cell):
+        return exactMean(cell['timeSum'])
+
+    def merge(self, other):
+        """
+        Adds the exports folded into another PartialSummary, with the same
+        settings and none of the same exports.
+        """
+        settings = lambda summary: (summary.seedVars, summary.timeColumnName, list(summary.timeline), summary.ratios)
+        if settings(other) != settings(self):
+            raise ValueError('Cannot merge summaries with different settings: ' + str(settings(self)[:2]) + ' and ' + str(settings(other)[:2]))
+        if self.names is not None and other.names is not None and other.names != self.names:
+            raise ValueError('Expected the columns ' + str(self.names) + ', got ' + str(other.names))
+        if self.files & other.files:
+            raise ValueError(str(len(self.files & other.files)) + ' exports are in both summaries, first ' + str(min(self.files & other.files)))
+        self.names = self.names if self.names is not None else other.names
+        self.files |= other.files
+        for key, cell in other.cells.items():
+            if key not in self.cells:
+                self.cells[key] = self.newCell()
+            mine = self.cells[key]
+            exactMerge(mine['mean'], cell['mean'])
+            exactMerge(mine['sum'], cell['sum'])
+            if cell['timeSum'] is not None:
+                if mine['timeSum'] is None:
+                    mine['timeSum'] = exactStart((len(self.timeline), len(self.names)))
+                exactMerge(mine['timeSum'], cell['timeSum'])
+
+def exactStart(shape, squares=False):
+    return {'count': np.zeros(shape, dtype=np.int64), 'floor': -53, 'sum': np.zeros(shape, dtype=object),
+            'squares': np.zeros(shape, dtype=object) if squares else None, 'infinite': np.zeros(shape)}
+
+def exactIntegers(values, floor):
+    """
+    Finite values as Python integers in units of 2 ** floor, exact as long as
+    floor is below the lowest bit of the mantissa of every value.
+    """
+    mantissas, exponents = np.frexp(values)
+    return (mantissas * 2.0 ** 53).astype(np.int64).astype(object) << (exponents - 53 - floor).astype(object)
+
+def exactRescale(state, floor):
+    """
+    Lowers the unit of the sums of an exact state to 2 ** floor.
+    """
+    if floor < state['floor']:
+        state['sum'] = state['sum'] << (state['floor'] - floor)
+        if state['squares'] is not None:
+            state['squares'] = state['squares'] << 2 * (state['floor'] - floor)
+        state['floor'] = floor
+
+def exactAdd(state, values):
+    """
+    Updates running sums and sums of squares with one more value per element,
+    NaNs are skipped. The sums are integers in units of 2 ** state['floor'],
+    the infinite values are summed apart, so no addition is ever rounded.
+    """
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    finite = np.isfinite(values)
+    state['count'] += valid
+    state['infinite'] += np.where(valid & ~finite, values, 0)
+    values = np.where(finite, values, 0)
+    exactRescale(state, min(state['floor'], int(np.frexp(values)[1].min(initial=0)) - 53))
+    integers = exactIntegers(values, state['floor'])
+    state['sum'] += integers
+    if state['squares'] is not None:
+        state['squares'] += integers * integers
+
+def exactMerge(state, other):
+    """
+    Adds the values summed in another exact state, leaving it unchanged.
+    """
+    exactRescale(state, other['floor'])
+    shift = other['floor'] - state['floor']
+    state['count'] += other['count']
+    state['infinite'] += other['infinite']
+    state['sum'] += other['sum'] << shift
+    if state['squares'] is not None:
+        state['squares'] += other['squares'] << 2 * shift
+
+def exactRatio(numerators, denominators):
+    # Python rounds the quotient of two integers correctly
+    ratio = np.frompyfunc(lambda n, d: n / d if d else float('nan'), 2, 1)
+    return ratio(numerators, denominators).astype(float)
+
+def exactMean(state):
+    mean = exactRatio(state['sum'], state['count'].astype(object) << -state['floor'])
+    return np.where(state['infinite'] == 0, mean, state['infinite'])
+
+def exactStd(state):
+    # population standard deviation, as xarray's std()
+    count = state['count'].astype(object)
+    variance = exactRatio(count * state['squares'] - state['sum'] * state['sum'], count * count << -2 * state['floor'])
+    return np.where(state['infinite'] == 0, np.sqrt(variance), float('nan'))
+
+def studentCdf(t, df):
+    """
+    Distribution function of Student's t, exact for arrays of integer degrees
+    of freedom (at least 1), from the finite trigonometric series.
+    """
+    t, df = np.broadcast_arrays(np.asarray(t, dtype=float), np.asarray(df, dtype=float))
+    theta = np.arctan(t / np.sqrt(df))
+    c2 = np.cos(theta) ** 2
+    odd = df % 2 == 1
+    # odd: 1/2 + (theta + sin cos (1 + 2/3 c2 + 2*4/(3*5) c2^2 ...)) / pi, even: 1/2 + sin/2 (1 + 1/2 c2 + 1*3/(2*4) c2^2 ...)
+    term = np.ones_like(t)
+    series = np.where(odd & (df < 3), 0, 1.0)
+    for k in range(1, int(np.max(df, initial=1)) // 2):
+        term = term * np.where(odd, 2 * k / (2 * k + 1), (2 * k - 1) / (2 * k)) * c2
+        series = series + np.where(k < (df - 1) // 2 + ~odd, term, 0)
+    sin = np.sin(theta)
+    return np.where(odd, 0.5 + (theta + sin * np.cos(theta) * series) / math.pi, 0.5 + sin / 2 * series)
+
+def studentQuantile(p, df):
+    """
+    Quantile of Student's t distribution, for arrays of degrees of freedom
+    (NaN below 1): exact for 1 and 2; otherwise from the Cornish-Fisher
+    expansion around the normal quantile, refined with Newton's method on
+    studentCdf() up to 30 degrees of freedom, where the expansion is coarse
+    (beyond, it is within 1e-6 relative for confidence levels up to 0.999).
+    """
+    df = np.asarray(df, dtype=float)
+    z = NormalDist().inv_cdf(p)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (z + (z ** 3 + z) / 4 / df + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96 / df ** 2
+             + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384 / df ** 3
+             + (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160 / df ** 4)
+        low = (df >= 3) & (df <= 30)
+        if np.any(low):
+            nu = np.where(low, df, 3)
+            lgamma = np.vectorize(math.lgamma)
+            scale = np.exp(lgamma((nu + 1) / 2) - lgamma(nu / 2)) / np.sqrt(nu * math.pi)
+            refined = np.where(low, t, z)
+            for step in range(4):
+                density = scale * (1 + refined ** 2 / nu) ** (-(nu + 1) / 2)
+                refined = refined - (studentCdf(refined, nu) - p) / density
+            t = np.where(low, refined, t)
+    t = np.where(df == 2, (2 * p - 1) / math.sqrt(2 * p * (1 - p)), t)
+    t = np.where(df == 1, math.tan(math.pi * (p - 0.5)), t)
+    return np.where(df >= 1, t, float('nan'))
+
+def seedConvergence(dataMean, seedVars, confidence=0.95):
+    """
+    Half-width of the t confidence interval of the mean among seeds, for
+    each variable and combination of the other experiment variables, as
+    the seeds accumulate in the order of their values.
+
+    Parameters
+    ----------
+    dataMean : xarray.Dataset
+        one value per seed, as the means over time of a dataset
+    seedVars : list of str
+        the dimensions of the seeds
+    confidence : float
+        confidence level of the intervals
+
+    Returns
+    -------
+    xarray.Dataset
+        The half-widths, with a 'seeds' dimension counting the seeds so far
+        in place of seedVars, NaN until two seeds have values
+
+    """
+    import xarray as xr
+    stacked = dataMean.stack(seedSample=seedVars).transpose('seedSample', ...)
+    names = list(stacked.data_vars)
+    dims = [d for d in stacked[names[0]].dims if d != 'seedSample']
+    values = np.stack([stacked[v].transpose('seedSample', *dims).values for v in names], axis=-1)
+    state = welfordStart(values.shape[1:])
+    widths = np.full(values.shape, float('nan'))
+    quantile = (1 + confidence) / 2
+    # one step per seed, every combination of the variables at once
+    for i, sample in enumerate(values):
+        welfordAdd(state, sample)
+        count = state['count']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            widths[i] = studentQuantile(quantile, count - 1) * np.sqrt(state['m2'] / (count - 1)) / np.sqrt(count)
+    coords = {d: stacked.coords[d].values for d in dims}
+    coords['seeds'] = np.arange(1, len(values) + 1)
+    return xr.Dataset({v: (['seeds'] + dims, widths[..., i]) for i, v in enumerate(names)}, coords=coords)
+
+def minimumSeeds(widths, precision, scale=None):
+    """
+    The number of seeds from which the confidence intervals stay within a
+    target precision, NaN where they never do.
+
+    Parameters
+    ----------
+    widths : xarray.Dataset
+        the half-widths computed by seedConvergence()
+    precision : float
+        the largest acceptable half-width
+    scale : xarray.Dataset
+        if given, precision is relative to the absolute value of its
+        variables, as the means among all the seeds
+
+    Returns
+    -------
+    xarray.Dataset
+        The minimum number of seeds of each variable and combination of the
+        experiment variables
+    """
+    if scale is not None:
+        widths = widths / abs(scale)
+    # met from some point on: the reversed cumulative product of the test is 1
+    met = (widths <= precision).isel(seeds=slice(None, None, -1)).cumprod('seeds').isel(seeds=slice(None, None, -1))
+    return (len(widths['seeds']) - met.sum('seeds') + 1).where(met.isel(seeds=-1))
+
+class SummaryTable:
+    """
+    The Reductions other than the values in time, as plain arrays with a fixed
+    order of dimensions plus, for each dimension, a map from coordinate value to
+    position: selecting is a dictionary lookup and a NumPy indexing, instead of
+    an xarray sel() per value. Summaries keyed by cellDim are laid out over the
+    dimensions only for the values selected.
+    """
+
+    def __init__(self, reductions, dims):
+        """
+        Parameters
+        ----------
+        reductions : Reductions
+            the summaries to index
+        dims : list of str
+            the dimensions of the summaries, in the order used by the arrays
+
+        """
+        self.dims = list(dims)
+        self.cells = None
+        if cellDim in reductions.timeMean.dims:
+            rows = [reductions.timeMean[d].values.tolist() for d in self.dims]
+            self.coords = {d: sorted(set(values)) for d, values in zip(self.dims, rows)}
+        else:
+            self.coords = {d: reductions.timeMean.coords[d].values.tolist() for d in self.dims}
+        self.index = {d: {v: i for i, v in enumerate(values)} for d, values in self.coords.items()}
+        if cellDim in reductions.timeMean.dims:
+            # position of each combination along the dimensions: its row
+            self.cells = {tuple(self.index[d][v] for d, v in zip(self.dims, row)): i for i, row in enumerate(zip(*rows))}
+        order = [cellDim] if self.cells is not None else self.dims
+        self.arrays = {
+            field: {v: dataset[v].transpose(*order).values for v in dataset.data_vars}
+            for field, dataset in reductions._asdict().items() if field != 'inTime'
+        }
+
+    def get(self, field, variable, **selection):
+        """
+        Selects values as Dataset.sel() would, by coordinate values.
+
+        Parameters
+        ----------
+        field : str
+            the reduction, one of the fields of Reductions
+        variable : str
+            the variable
+        selection : dict
+            dimension: value, to drop the dimension, or dimension: list of
+            values, to keep the dimension with the values in the given order.
+            The dimensions not mentioned are kept whole
+
+        Returns
+        -------
+        ndarray
+            The values, with the kept dimensions in the order of dims
+
+        """
+        unknown = set(selection) - set(self.dims)
+        if unknown:
+            raise KeyError('Unknown dimensions ' + str(sorted(unknown)) + ', expected some of ' + str(self.dims))
+        positions = []
+        shape = []
+        for d in self.dims:
+            if d not in selection:
+                positions.append(np.arange(len(self.coords[d])))
+                shape.append(len(self.coords[d]))
+            elif isinstance(selection[d], (list, tuple, np.ndarray)):
+                positions.append([self.index[d][v] for v in selection[d]])
+                shape.append(len(selection[d]))
+            else:
+                positions.append([self.index[d][selection[d]]])
+        values = self.arrays[field][variable]
+        if self.cells is None:
+            return values[np.ix_(*positions)].reshape(shape)
+        rows = np.array([self.cells.get(position, -1) for position in itertools.product(*positions)], dtype=np.int64)
+        return np.where(rows >= 0, values[rows], float('nan')).reshape(shape)
@@ -0,0 +1,134 @@
+"""
+Instrumentation of a run: time, memory and throughput of each stage, and
+progress of the long loops.
+"""
+import datetime
+import json
+import math
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+def peakMemory():
+    """
+    Returns
+    -------
+    tuple
+        Peak resident memory in MB of this process and of the largest of its
+        terminated children, (None, None) where it cannot be measured
+    """
+    if resource is None:
+        return None, None
+    scale = 1 / 2 ** 20 if sys.platform == 'darwin' else 1 / 2 ** 10 # bytes on macOS, KB elsewhere
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale)
+
+def cpuTime():
+    """
+    User and system time of this process and of its terminated children, so
+    that the work of the process pools is counted once they are shut down.
+    """
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+class RunReport:
+    """
+    The stages of a run, with wall and CPU time, peak memory and, when they
+    are known, the number of files and rows processed per second.
+    """
+
+    def __init__(self, command=None):
+        self.started = datetime.datetime.now().isoformat(timespec='seconds')
+        self.command = list(sys.argv if command is None else command)
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name, **labels):
+        """
+        Measures the code run in the with block. The yielded dict is the record
+        of the stage, the block can set 'files' and 'rows' in it.
+
+        Parameters
+        ----------
+        name : str
+            the stage
+        labels : dict
+            more values to record, as the experiment
+
+        """
+        record = dict(stage=name, **labels)
+        wall, cpu = time.perf_counter(), cpuTime()
+        try:
+            yield record
+        finally:
+            record['wallSeconds'] = time.perf_counter() - wall
+            record['cpuSeconds'] = cpuTime() - cpu
+            record['peakRssMB'], record['peakChildRssMB'] = peakMemory()
+            for count in ('files', 'rows'):
+                if record.get(count) is not None and record['wallSeconds'] > 0:
+                    record[count + 'PerSecond'] = record[count] / record['wallSeconds']
+            self.stages.append(record)
+
+    def summary(self):
+        """
+        The stages in a human readable table.
+        """
+        lines = []
+        for record in self.stages:
+            line = '{:<24} {:8.2f}s wall {:8.2f}s cpu'.format(
+                record['stage'] + (' ' + record['experiment'] if 'experiment' in record else ''), record['wallSeconds'], record['cpuSeconds'])
+            if record['peakRssMB'] is not None:
+                line += ' {:8.1f} MB peak'.format(max(record['peakRssMB'], record['peakChildRssMB']))
+            for count in ('files', 'rows'):
+                if count + 'PerSecond' in record:
+                    line += ' {:10.1f} {}/s'.format(record[count + 'PerSecond'], count)
+            if not math.isnan(record.get('readOverlap', float('nan'))):
+                line += ' {:4.0%} of {:.2f}s reading hidden'.format(record['readOverlap'], record['readSeconds'])
+            lines.append(line)
+        return '\n'.join(lines)
+
+    def save(self, path):
+        """
+        Writes the report as JSON, replacing path only once it is complete.
+        """
+        with open(path + '.tmp', 'w') as file:
+            json.dump({'started': self.started, 'command': self.command, 'stages': self.stages}, file, indent=2)
+        os.replace(path + '.tmp', path)
+
+def progress(iterable, total, label, every=5.0, out=None):
+    """
+    Yields the items of iterable, printing how many were done, their rate and
+    the time left at most once every few seconds, and after the last one.
+
+    Parameters
+    ----------
+    iterable : iterable
+        the items, as the exports being read
+    total : int
+        number of items
+    label : str
+        what is being done, printed first
+    every : float
+        minimum seconds between two prints
+    out : file
+        where to print, standard error if None
+
+    """
+    out = sys.stderr if out is None else out
+    start = last = time.perf_counter()
+    done = 0
+    for item in iterable:
+        yield item
+        done += 1
+        now = time.perf_counter()
+        if now - last >= every or done == total:
+            rate = done / (now - start) if now > start else float('inf')
+            left = (total - done) / rate if rate > 0 else float('nan')
+            print('{}: {}/{} files, {:.1f} files/s, {:.0f}s left'.format(label, done, total, rate, left), file=out, flush=True)
+            last = now
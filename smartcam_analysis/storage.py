@@ -0,0 +1,372 @@
+"""
+Persistence of the processed data: datasets spliced from the exports, the
+per-file cache of the ingested exports and the manifests of what was done.
+"""
+import numpy as np
+import fnmatch
+import functools
+import gzip
+import hashlib
+import os
+import pickle
+
+from .ingest import Export, memberSeparator, mergeDicts
+from .reduce import PartialSummary, Reductions, cellDim, coarsenTime, densify, runDim
+
+def storageDtype(name, dtypes):
+    """
+    Picks the dtype a variable is stored with.
+
+    Parameters
+    ----------
+    name : str
+        name of the variable
+    dtypes : dict
+        shell-style patterns of variable names, and the dtype to use for them
+
+    Returns
+    -------
+    numpy.dtype
+        The dtype of the first pattern matching name, float64 if none does
+
+    """
+    return np.dtype(next((dtype for pattern, dtype in dtypes.items() if fnmatch.fnmatch(name, pattern)), np.float64))
+
+def spliceExports(dataset, exports, timeColumnName, timeline, removed=(), dtypes={}):
+    """
+    Writes ingested exports into a dataset, growing its coordinates when the
+    headers contain values that are not there yet.
+
+    The variables sharing a dtype are views of a single preallocated block,
+    and the exports are written there with plain slice assignments, using
+    the position of their coordinates along each dimension.
+
+    Parameters
+    ----------
+    dataset : xarray.Dataset
+        the dataset to update, None to create a new one
+    exports : list of Export
+        results of ingestExport()
+    timeColumnName : str
+        name of the time column
+    timeline : ndarray
+        the timeline the exports were resampled onto
+    removed : list of dict
+        coordinates of the files that do not exist anymore, their values are
+        replaced with NaN
+    dtypes : dict
+        dtype of the new variables, see storageDtype()
+
+    Returns
+    -------
+    xarray.Dataset
+        The updated dataset, which may or may not be the same object
+
+    """
+    import xarray as xr
+    existing = [] if dataset is None or not dataset.data_vars else list(next(iter(dataset.data_vars.values())).dims)
+    dimensions = {k: set(dataset.coords[k].values.tolist()) for k in existing if k != timeColumnName}
+    for export in exports:
+        dimensions = mergeDicts(dimensions, export.coordinates)
+    # Keep the order of the headers, so that the layout does not change between runs
+    order = dict.fromkeys(existing + [k for export in exports for k in export.coordinates])
+    dimensions = {k: sorted(dimensions[k]) for k in order if k != timeColumnName}
+    index = {k: {v: i for i, v in enumerate(values)} for k, values in dimensions.items()}
+    # Add time to the independent variables
+    dimensions[timeColumnName] = range(0, len(timeline))
+    shape = tuple(len(v) for v in dimensions.values())
+    names = list(dict.fromkeys((list(dataset.data_vars) if dataset is not None else []) + [v for export in exports for v in export.names]))
+    if dataset is None or any(len(v) != dataset.sizes[k] for k, v in dimensions.items()) or any(v not in dataset for v in names):
+        # Allocate one block per dtype, then move the previous values (if any) into it
+        dtypeOf = {v: dataset[v].dtype if dataset is not None and v in dataset else storageDtype(v, dtypes) for v in names}
+        blocks = {}
+        for dtype in dict.fromkeys(dtypeOf.values()):
+            group = [v for v in names if dtypeOf[v] == dtype]
+            block = np.full((len(group),) + shape, float('nan'), dtype=dtype)
+            blocks.update({v: block[i] for i, v in enumerate(group)})
+        if dataset is not None:
+            moved = np.ix_(*[[index[k][v] for v in dataset.coords[k].values.tolist()] for k in existing if k != timeColumnName])
+            for v in dataset.data_vars:
+                blocks[v][moved] = dataset[v].transpose(*dimensions).values
+        dataset = xr.Dataset({v: (list(dimensions), blocks[v]) for v in names}, coords=dimensions)
+    dataset[timeColumnName] = timeline
+    def position(coordinates):
+        return tuple(index[k][coordinates[k]] if k in coordinates else slice(None) for k in dimensions if k != timeColumnName)
+    values = {v: dataset[v].values for v in names}
+    for coordinates in removed:
+        for v in names:
+            values[v][position(coordinates)] = float('nan')
+    for export in exports:
+        where = position(export.coordinates)
+        for idx, v in enumerate(export.names):
+            values[v][where] = export.data[:, idx]
+    return dataset
+
+def spliceRuns(dataset, exports, timeColumnName, timeline, removed=(), dtypes={}):
+    """
+    Same as spliceExports(), but stores one row per export along runDim, with
+    the experiment variables as coordinates along it, instead of laying the
+    exports out over the product of the values of the variables: irregular
+    sweeps take only the memory of the exports that exist. An export with
+    the same coordinates as a row replaces it, the rows are kept sorted by
+    coordinates.
+
+    Parameters
+    ----------
+    see spliceExports()
+
+    Returns
+    -------
+    xarray.Dataset
+        The updated dataset, a new object
+    """
+    import xarray as xr
+    previous = [] if dataset is None or not dataset.data_vars else [k for k, v in dataset.coords.items() if v.dims == (runDim,)]
+    variables = list(dict.fromkeys(previous + [k for export in exports for k in export.coordinates]))
+    key = lambda coordinates: tuple(coordinates.get(k, float('nan')) for k in variables)
+    rows = {} if not previous else {row: ('dataset', i) for i, row in enumerate(zip(*[dataset[k].values.tolist() for k in variables]))}
+    for coordinates in removed:
+        rows.pop(key(coordinates), None)
+    rows.update({key(export.coordinates): ('export', export) for export in exports})
+    keys = sorted(rows, key=lambda row: tuple((v != v, v) for v in row)) # missing coordinates last
+    names = list(dict.fromkeys((list(dataset.data_vars) if dataset is not None else []) + [v for export in exports for v in export.names]))
+    dtypeOf = {v: dataset[v].dtype if dataset is not None and v in dataset else storageDtype(v, dtypes) for v in names}
+    blocks = {}
+    for dtype in dict.fromkeys(dtypeOf.values()):
+        group = [v for v in names if dtypeOf[v] == dtype]
+        block = np.full((len(group), len(keys), len(timeline)), float('nan'), dtype=dtype)
+        blocks.update({v: block[i] for i, v in enumerate(group)})
+    kept = [(i, rows[row][1]) for i, row in enumerate(keys) if rows[row][0] == 'dataset']
+    if kept:
+        to, source = map(list, zip(*kept))
+        for v in dataset.data_vars:
+            blocks[v][to] = dataset[v].transpose(runDim, timeColumnName).values[source]
+    for i, row in enumerate(keys):
+        kind, export = rows[row]
+        if kind == 'export':
+            for idx, v in enumerate(export.names):
+                blocks[v][i] = export.data[:, idx]
+    coords = {k: (runDim, [row[j] for row in keys]) for j, k in enumerate(variables)}
+    coords[timeColumnName] = timeline
+    return xr.Dataset({v: ((runDim, timeColumnName), blocks[v]) for v in names}, coords=coords)
+
+def fileSignature(path, contentHash=False):
+    """
+    Identifies a version of a file, to tell whether it changed since it was last processed.
+
+    Parameters
+    ----------
+    path : str
+        path to the target file, or archive::member for a member of a tar
+        archive, which changes with its archive
+    contentHash : bool
+        also hash the content, slower but immune to touched files and coarse mtimes
+
+    Returns
+    -------
+    tuple
+        Size, modification time and optionally SHA-1 of the file, followed
+        by the name of the member
+
+    """
+    path, separator, member = path.partition(memberSeparator)
+    stat = os.stat(path)
+    signature = (stat.st_size, stat.st_mtime_ns)
+    if contentHash:
+        signature += (contentDigest(path, *signature),)
+    return signature + ((member,) if separator else ())
+
+@functools.lru_cache(maxsize=16)
+def contentDigest(path, size, mtime):
+    """
+    SHA-1 of a file, computed once for all the members of an archive.
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def blockPath(cacheDir, path):
+    return os.path.join(cacheDir, hashlib.sha1(path.encode()).hexdigest() + '.pkl')
+
+def saveBlock(cacheDir, path, export):
+    os.makedirs(cacheDir, exist_ok=True)
+    with open(blockPath(cacheDir, path), 'wb') as file:
+        # plain types only, so that the cache can be read from any script
+        pickle.dump(export._asdict(), file, protocol=-1)
+
+def loadBlock(cacheDir, path):
+    with open(blockPath(cacheDir, path), 'rb') as file:
+        return Export(**pickle.load(file))
+
+def loadManifest(cacheDir, name='manifest'):
+    """
+    Loads what was processed in the previous runs.
+
+    Returns
+    -------
+    dict
+        For each experiment, the settings used to resample and, for each
+        file, its signature and coordinates (for the 'charts' manifest, the
+        fingerprint of each chart). Empty if there is no cache
+    """
+    try:
+        with open(os.path.join(cacheDir, name), 'rb') as file:
+            return pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return {}
+
+def saveManifest(cacheDir, manifest, name='manifest'):
+    os.makedirs(cacheDir, exist_ok=True)
+    path = os.path.join(cacheDir, name)
+    with open(path + '.tmp', 'wb') as file:
+        pickle.dump(manifest, file, protocol=-1)
+    os.replace(path + '.tmp', path)
+
+def datasetPath(prefix, experiment):
+    return prefix + '_' + experiment + '.nc'
+
+def saveDataset(dataset, path, chunks):
+    """
+    Writes a dataset to a compressed NetCDF file, chunked so that it can be
+    reduced later on without loading it all in memory.
+
+    Parameters
+    ----------
+    dataset : xarray.Dataset
+        the dataset to save
+    path : str
+        the destination file, replaced only once the new one is complete
+    chunks : dict
+        size of the chunks along some dimensions, the others are not split
+
+    """
+    encoding = {
+        v: {'zlib': True, 'complevel': 4, 'chunksizes': tuple(min(chunks.get(k, n), n) for k, n in dataset[v].sizes.items())}
+        for v in dataset.data_vars
+    }
+    dataset.to_netcdf(path + '.tmp', encoding=encoding)
+    os.replace(path + '.tmp', path)
+
+def openDataset(path):
+    """
+    Lazily opens a dataset written by saveDataset(): values are backed by
+    dask arrays following the chunks on disk, and are read only when computed.
+    """
+    import xarray as xr
+    return xr.open_dataset(path, chunks={})
+
+def reductionsPath(prefix, experiment):
+    return prefix + '_' + experiment + '_reductions.nc'
+
+def saveReductions(reductions, path, timeColumnName='time', levels=()):
+    """
+    Writes Reductions to a NetCDF file, one group per field, replacing the
+    destination only once the new file is complete.
+
+    Parameters
+    ----------
+    reductions : Reductions
+        the summaries
+    path : str
+        the destination file
+    timeColumnName : str
+        name of the time dimension
+    levels : list of int
+        numbers of instants of the coarser copies of the values in time to
+        write too, in groups inTime_<samples>, see readInTime()
+
+    """
+    levels = sorted(levels) if reductions.inTime.data_vars else []
+    for i, (field, dataset) in enumerate(reductions._asdict().items()):
+        if field == 'inTime' and levels:
+            dataset = dataset.assign_attrs(levels=levels)
+        dataset.to_netcdf(path + '.tmp', mode='w' if i == 0 else 'a', group=field)
+    for samples in levels:
+        coarsenTime(reductions.inTime, timeColumnName, samples).to_netcdf(path + '.tmp', mode='a', group='inTime_' + str(samples))
+    os.replace(path + '.tmp', path)
+
+def loadReductions(path, inTime=True):
+    """
+    Reads the Reductions written by saveReductions(), all in memory, but for
+    the values in time if inTime is False (they are then an empty Dataset,
+    see readInTime()).
+    """
+    import xarray as xr
+    fields = {}
+    for field in Reductions._fields:
+        if field == 'inTime' and not inTime:
+            fields[field] = xr.Dataset()
+            continue
+        with xr.open_dataset(path, group=field) as dataset:
+            fields[field] = dataset.load()
+    return Reductions(**fields)
+
+def readInTime(path, timeColumnName='time', start=None, stop=None, samples=None, **selection):
+    """
+    Reads a window of the values in time of the Reductions written by
+    saveReductions(), from the coarsest copy with enough instants in it:
+    only the instants and the cells asked for are read from the file.
+
+    Parameters
+    ----------
+    path : str
+        the file
+    timeColumnName : str
+        name of the time dimension
+    start, stop : float
+        the window, start <= time < stop, None not to bound it
+    samples : int
+        fewest instants wanted in the window, None for all the instants
+    selection : dict
+        variable: value or list of values, see densify()
+
+    Returns
+    -------
+    xarray.Dataset
+        The values in time in the window
+    """
+    import xarray as xr
+    with xr.open_dataset(path, group='inTime') as dataset:
+        levels = sorted(np.atleast_1d(dataset.attrs.get('levels', [])).tolist())
+    groups = ['inTime_' + str(level) for level in levels if samples is not None] + ['inTime']
+    for group in groups:
+        with xr.open_dataset(path, group=group) as dataset:
+            if timeColumnName not in dataset.indexes:
+                return dataset.load()
+            times = dataset.indexes[timeColumnName]
+            window = slice(None if start is None else times.searchsorted(start), None if stop is None else times.searchsorted(stop))
+            dataset = dataset.isel({timeColumnName: window})
+            if group == groups[-1] or dataset.sizes[timeColumnName] >= samples:
+                return densify(dataset, cellDim, **selection).load()
+
+def partialPath(prefix, experiment, host):
+    return prefix + '_' + experiment + '_' + host + '.partial'
+
+def savePartial(summary, path, **labels):
+    """
+    Writes a PartialSummary with pickle, as plain types and numpy arrays, and
+    labels describing how it was computed. The file is compressed, the exact
+    sums are mostly small integers.
+    """
+    state = dict(vars(summary), files=sorted(summary.files), labels=labels)
+    with gzip.open(path + '.tmp', 'wb') as file:
+        pickle.dump(state, file, protocol=-1)
+    os.replace(path + '.tmp', path)
+
+def loadPartial(path):
+    """
+    Reads a PartialSummary written by savePartial().
+
+    Returns
+    -------
+    tuple
+        The summary and its labels
+    """
+    with gzip.open(path, 'rb') as file:
+        state = pickle.load(file)
+    labels = state.pop('labels')
+    summary = PartialSummary(state['seedVars'], state['timeColumnName'], state['timeline'], state['ratios'])
+    vars(summary).update(state, files=set(map(tuple, state['files'])))
+    return summary, labels
@@ -0,0 +1,115 @@
+"""
+Synthetic Alchemist exports, in the format written by the simulations (time,
+CamerasKCoverage and DistanceTraveled columns), to measure the pipeline
+without running a sweep.
+"""
+import io
+import itertools
+import os
+
+import numpy as np
+
+exportNames = ['time', '3-coverage', '2-coverage', '1-coverage', 'CamDist', 'ObjDist']
+# The grid of simulations.yml
+defaultGrid = {
+    'Algorithm': ['zz_linpro', 'ff_linpro', 'zz_linproF', 'ff_linproF', 'ff_nocomm', 'nocomm', 'sm_av', 'bc_re'],
+    'CamObjRatio': [0.2, 0.4, 0.6, 0.8, 1.0, 1.2, 1.4, 1.6, 1.8, 2.0],
+    'CommunicationRange': [10.0, 25.0, 50.0, 100.0, 200.0],
+}
+
+def exportHeader(coordinates, names):
+    """
+    The header Alchemist writes before the data, with the values of the
+    variables and the names of the columns.
+    """
+    return ('#' * 69 + '\n'
+            '# Alchemist log file - simulation started at: Thu Jan 09 11:22:33 CET 2020 #\n'
+            + '#' * 69 + '\n#\n'
+            '# ' + ', '.join(k + ' = ' + str(v) for k, v in coordinates.items()) + '\n#\n'
+            '# The columns have the following meaning: \n'
+            '# ' + ''.join(name + ' ' for name in names) + '\n')
+
+def exportFooter():
+    return ('#' * 69 + '\n'
+            '# End of data export. Simulation finished at: Thu Jan 09 11:25:00 CET 2020 #\n'
+            + '#' * 69 + '\n')
+
+def syntheticData(rows, step=1.0, jitter=0.0, rng=None):
+    """
+    Values that look like a simulation: increasing times spaced by step plus
+    a uniform jitter, k-coverages between 0 and 1 with 3 <= 2 <= 1 and NaN
+    at time 0, and non-negative distances.
+
+    Parameters
+    ----------
+    rows : int
+        number of rows
+    step : float
+        mean distance between two samples
+    jitter : float
+        maximum deviation of each sample from its regular spacing, below
+        step / 2 to keep the times increasing
+    rng : numpy.random.Generator
+        source of the values, a new one if None
+
+    Returns
+    -------
+    ndarray
+        The values with shape (rows, len(exportNames))
+
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    times = np.arange(rows, dtype=float) * step
+    if jitter:
+        times[1:] += rng.uniform(-jitter, jitter, rows - 1)
+    coverages = np.sort(rng.uniform(0, 1, (rows, 3)), axis=1)
+    coverages[0] = float('nan')
+    distances = rng.uniform(0, 1, (rows, 2)) * [10, 5]
+    return np.column_stack([times, coverages, distances])
+
+def writeExport(path, coordinates, data, names=exportNames):
+    """
+    Writes values as an Alchemist export: header, one space-terminated line
+    per row with NaN spelt as Java does, and footer.
+    """
+    body = io.StringIO()
+    np.savetxt(body, data, fmt='%s', delimiter=' ', newline=' \n')
+    with open(path, 'w') as file:
+        file.write(exportHeader(coordinates, names))
+        file.write(body.getvalue().replace('nan', 'NaN'))
+        file.write(exportFooter())
+
+def generateExports(directory, seeds, rows, step=1.0, jitter=0.0, grid=defaultGrid, experiment='simulations', seed=0):
+    """
+    Writes one synthetic export per combination of seed and grid values, named
+    as Alchemist names them.
+
+    Parameters
+    ----------
+    directory : str
+        the destination directory, created if needed
+    seeds : int
+        number of values of Seed, 0 to seeds - 1
+    rows, step, jitter : see syntheticData()
+    grid : dict
+        variable: values, the other variables of the experiment
+    experiment : str
+        prefix of the file names
+    seed : int
+        seed of the values, the same arguments give the same files
+
+    Returns
+    -------
+    list of str
+        The paths written, sorted
+
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    paths = []
+    for values in itertools.product([float(s) for s in range(seeds)], *grid.values()):
+        coordinates = dict(zip(['Seed'] + list(grid), values))
+        name = experiment + ''.join('_' + k + '-' + str(v) for k, v in coordinates.items()) + '.txt'
+        paths.append(os.path.join(directory, name))
+        writeExport(paths[-1], coordinates, syntheticData(rows, step, jitter, rng))
+    return sorted(paths)
@@ -0,0 +1,476 @@
+import gzip
+import io
+import json
+import lzma
+import os
+import tarfile
+
+import numpy as np
+import pytest
+
+import xarray as xr
+
+from smartcam_analysis import charts, cli
+from smartcam_analysis.catalog import Catalog
+from smartcam_analysis.charts import (chartFingerprint, chartSources, getSurfData, plotKcov3D, plotKcovHeatmap, plotMovEfficiency, renderCharts,
+                                      writeKcovLatex)
+from smartcam_analysis.ingest import (Export, ExportTail, convert, extractCoordinates, extractVariableNames, ingestFiles, integrate, openCsv, readExport, resample,
+                                      ReadAhead, archiveCursors, archiveMembers, closeArchives, columnarPath, convertExport, ingestExport, iterIngest, scanExport, summarizeExport)
+from smartcam_analysis.reduce import (PartialSummary, StreamingSummary, SummaryTable, cellDim, densify, minimumSeeds, reduceDataset, reduceRuns,
+                                      seedConvergence, studentQuantile)
+from smartcam_analysis.report import RunReport, progress
+from smartcam_analysis.storage import loadPartial, loadReductions, readInTime, savePartial, saveReductions, spliceExports, spliceRuns
+from smartcam_analysis.synthetic import generateExports, syntheticData
+
+def randomExport(rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    times = np.cumsum(rng.uniform(0.5, 3.5, rows))
+    values = rng.uniform(0, 1, (rows, 5))
+    values[rng.uniform(size=values.shape) < 0.05] = float('nan')
+    return np.column_stack([times, values])
+
+@pytest.mark.parametrize('seed', range(5))
+def test_resample_matches_convert(seed):
+    data = randomExport(seed=seed)
+    timeline = np.linspace(-10, data[-1, 0] + 10, 2000)
+    expected = np.asarray(convert(0, timeline, np.matrix(data)))
+    np.testing.assert_array_equal(resample(0, timeline, data), expected)
+
+def test_resample_matches_convert_on_ties():
+    data = np.column_stack([np.arange(0, 20, 2.0), np.arange(10.0)])
+    timeline = np.arange(-1, 21, 1.0)
+    expected = np.asarray(convert(0, timeline, np.matrix(data)))
+    np.testing.assert_array_equal(resample(0, timeline, data), expected)
+
+def test_resample_takes_the_first_row_of_duplicate_times():
+    # convert() does not pick a defined row among duplicates, resample() takes the first one
+    data = np.array([[0, 0], [2, 1], [2, 2], [2, 3], [5, 4], [5, 5]], dtype=float)
+    timeline = np.array([-1, 1.5, 2, 2.5, 4, 5, 6])
+    np.testing.assert_array_equal(resample(0, timeline, data)[:, 1], [0, 1, 1, 1, 4, 4, 4])
+    np.testing.assert_array_equal(resample(0, timeline, data, 'previous')[:, 1], [0, 0, 1, 1, 1, 4, 4])
+
+def test_resample_previous_and_linear():
+    data = np.array([[0, 0], [2, 10], [4, 20]], dtype=float)
+    timeline = np.array([-1, 0, 1, 3.5, 4, 5])
+    np.testing.assert_array_equal(resample(0, timeline, data, 'previous')[:, 1], [0, 0, 0, 10, 20, 20])
+    np.testing.assert_array_equal(resample(0, timeline, data, 'linear')[:, 1], [0, 0, 5, 17.5, 20, 20])
+
+def test_resample_rejects_unknown_modes():
+    with pytest.raises(ValueError):
+        resample(0, [0], np.zeros((1, 2)), 'cubic')
+
+exportText = """#####################################################################
+# Alchemist log file - simulation started at: Thu Jan 09 11:22:33 CET 2020 #
+#####################################################################
+#
+# Seed = 3.0, Algorithm = ff_linpro, CamObjRatio = 0.2, CommunicationRange = 100.0
+#
+# The columns have the following meaning: 
+# time 3-coverage 2-coverage 1-coverage CamDist ObjDist 
+0.0 NaN NaN NaN 0.0 0.0 
+2.0 0.1 0.25 0.5 12.5 3.0 
+4.0 0.0 0.5 1.0 1e-3 2.75 
+#####################################################################
+# End of data export. Simulation finished at: Thu Jan 09 11:25:00 CET 2020 #
+#####################################################################
+"""
+
+def test_readExport_matches_legacy_parsers(tmp_path):
+    path = str(tmp_path / 'simulations_test.txt')
+    with open(path, 'w') as file:
+        file.write(exportText)
+    export = readExport(path)
+    assert export.coordinates == extractCoordinates(path)
+    assert export.names == extractVariableNames(path)
+    assert export.data.dtype == np.float64 and export.data.flags['C_CONTIGUOUS']
+    np.testing.assert_array_equal(export.data, np.array(openCsv(path)))
+
+def test_ingestFiles_in_parallel_matches_serial(tmp_path):
+    files = []
+    for seed in range(4):
+        path = str(tmp_path / 'simulations_{}.txt'.format(seed))
+        with open(path, 'w') as file:
+            file.write(exportText.split('0.0 NaN')[0].replace('Seed = 3.0', 'Seed = {}.0'.format(seed)))
+            file.writelines(' '.join(map(str, row)) + '\n' for row in randomExport(seed=seed))
+        files.append(path)
+    timeline = np.linspace(0, 100, 50)
+    serial = ingestFiles(files, 'time', timeline)
+    parallel = ingestFiles(files, 'time', timeline, workers=2)
+    assert [e.coordinates['Seed'] for e in parallel] == [0, 1, 2, 3]
+    for s, p in zip(serial, parallel):
+        assert s.coordinates == p.coordinates and s.names == p.names
+        np.testing.assert_array_equal(s.data, p.data)
+
+def test_ReadAhead_reads_the_same_within_its_memory_cap(tmp_path):
+    files = generateExports(str(tmp_path), 2, 40, jitter=0.3, grid={'Algorithm': ['ff_linpro', 'nocomm', 'sm_av']})
+    with gzip.open(files[0] + '.gz', 'wt') as file, open(files[0]) as text:
+        file.write(text.read())
+    files[0] += '.gz'
+    timeline = np.linspace(0, 30, 20)
+    readAhead = ReadAhead(threads=2, memoryCap=2 * os.path.getsize(files[1]))
+    exports = list(iterIngest(files, 'time', timeline, readAhead=readAhead))
+    for file, export in zip(files, exports):
+        expected = ingestExport(file, 'time', timeline)
+        assert export.coordinates == expected.coordinates
+        np.testing.assert_array_equal(export.data, expected.data)
+    metrics = readAhead.metrics()
+    assert metrics['readAheadFiles'] == len(files) and metrics['readAheadMB'] * 2 ** 20 == sum(os.path.getsize(f) for f in files)
+    assert metrics['readAheadPeakMB'] * 2 ** 20 <= readAhead.memoryCap and 0 <= metrics['readOverlap'] <= 1
+
+def test_spliceExports_grows_coordinates():
+    timeline = np.arange(3.0)
+    first = Export({'Seed': 0.0, 'Algorithm': 'a'}, ['x'], np.ones((3, 1)))
+    dataset = spliceExports(None, [first], 'time', timeline)
+    second = Export({'Seed': 1.0, 'Algorithm': 'b'}, ['x'], np.full((3, 1), 2.0))
+    dataset = spliceExports(dataset, [second], 'time', timeline, removed=[first.coordinates])
+    assert dataset['x'].dims == ('Seed', 'Algorithm', 'time')
+    assert dataset.coords['Algorithm'].values.tolist() == ['a', 'b']
+    np.testing.assert_array_equal(dataset['x'].sel(Seed=1.0, Algorithm='b'), [2, 2, 2])
+    assert int(dataset['x'].count()) == 3
+
+def test_StreamingSummary_matches_reduceDataset():
+    rng = np.random.default_rng(42)
+    timeline = np.arange(20.0)
+    ratios = {'ratio': ('x', 'y')}
+    exports = []
+    for seed in range(5):
+        for algorithm in ['a', 'b']:
+            if seed == 4 and algorithm == 'b':
+                continue # a missing file must not count in the reductions
+            values = rng.uniform(0, 1, (len(timeline), 2))
+            values[rng.uniform(size=values.shape) < 0.1] = float('nan')
+            exports.append(Export({'Seed': float(seed), 'Algorithm': algorithm}, ['x', 'y'], values))
+    expected = reduceDataset(spliceExports(None, exports, 'time', timeline), ['Seed'], 'time', ratios)
+    summary = StreamingSummary(['Seed'], 'time', timeline, ratios)
+    for export in exports:
+        summary.add(export)
+    for reference, streamed in zip(expected, summary.reductions()):
+        xr.testing.assert_allclose(reference, streamed)
+
+def test_reduceRuns_matches_reduceDataset_on_irregular_sweeps():
+    rng = np.random.default_rng(1)
+    timeline = np.arange(6.0)
+    combinations = [(0, 'a', 10.0), (0, 'a', 100.0), (0, 'b', 10.0), (1, 'a', 10.0), (1, 'b', 10.0), (1, 'a', 100.0), (2, 'a', 100.0)]
+    exports = [Export({'Seed': float(seed), 'Algorithm': algo, 'Range': r}, ['x', 'y'], rng.uniform(size=(6, 2))) for seed, algo, r in combinations]
+    runs = spliceRuns(None, exports[::-1], 'time', timeline)
+    assert runs.sizes == {'run': 7, 'time': 6} and runs['Algorithm'].values.tolist() == ['a', 'a', 'b', 'a', 'a', 'b', 'a']
+    xr.testing.assert_identical(spliceRuns(spliceRuns(None, exports[:4], 'time', timeline), exports[2:], 'time', timeline, [exports[0].coordinates]),
+                                spliceRuns(None, exports[1:], 'time', timeline))
+    dense = reduceDataset(spliceExports(None, exports, 'time', timeline), ['Seed'], 'time', {'q': ('x', 'y')})
+    sparse = reduceRuns(runs, ['Seed'], 'time', {'q': ('x', 'y')})
+    assert sparse.timeMean.sizes == {cellDim: 3}
+    for expected, cells in zip(dense, sparse):
+        xr.testing.assert_allclose(expected, densify(cells, cellDim, Algorithm=['a', 'b'], Range=[10.0, 100.0]).transpose(*expected.dims))
+    table, cells = SummaryTable(dense, ['Algorithm', 'Range']), SummaryTable(sparse, ['Algorithm', 'Range'])
+    for selection in [{}, {'Algorithm': 'b'}, {'Algorithm': ['b', 'a'], 'Range': 100.0}]:
+        np.testing.assert_allclose(cells.get('timeMeanStd', 'x', **selection), table.get('timeMeanStd', 'x', **selection))
+
+def test_SummaryTable_selects_as_sel():
+    rng = np.random.default_rng(1)
+    timeline = np.arange(5.0)
+    exports = [Export({'Seed': float(seed), 'Algorithm': algorithm, 'Range': r}, ['x'], rng.uniform(size=(5, 1)))
+               for seed in range(3) for algorithm in ['a', 'b', 'c'] for r in [10.0, 20.0]]
+    reductions = reduceDataset(spliceExports(None, exports, 'time', timeline), ['Seed'], 'time')
+    table = SummaryTable(reductions, ['Range', 'Algorithm'])
+    mean = reductions.timeMean['x']
+    np.testing.assert_array_equal(table.get('timeMean', 'x', Algorithm='b', Range=20.0), mean.sel(Algorithm='b', Range=20.0))
+    np.testing.assert_array_equal(table.get('timeMean', 'x', Algorithm=['c', 'a'], Range=10.0), mean.sel(Algorithm=['c', 'a'], Range=10.0))
+    np.testing.assert_array_equal(table.get('timeMeanStd', 'x'), reductions.timeMeanStd['x'].transpose('Range', 'Algorithm'))
+    with pytest.raises(KeyError):
+        table.get('timeMean', 'x', Seed=0.0)
+
+def test_renderCharts_in_parallel(tmp_path):
+    algos = ['a', 'b']
+    jobs = [(plotMovEfficiency, dict(path=str(tmp_path / 'bars.pdf'), algos=algos, values=np.array([0.2, 0.4]),
+                                     errors=np.array([0.1, 0.0]), color='red', ecolor='blue')),
+            (writeKcovLatex, dict(path=str(tmp_path / 'table.txt'), kcov='1-coverage', algos=algos, commRanges=[10],
+                                  ratios=[0.5], means=np.full((1, 2, 1), 0.5), stds=np.zeros((1, 2, 1))))]
+    assert renderCharts(jobs, workers=2) == [kwargs['path'] for function, kwargs in jobs]
+    assert (tmp_path / 'bars.pdf').stat().st_size > 0
+    assert r'& a & 0.50 (0.00) \\' in (tmp_path / 'table.txt').read_text()
+
+def test_renderCharts_leaves_the_backend_of_this_process_alone(tmp_path, monkeypatch):
+    import matplotlib
+    def use(backend):
+        raise AssertionError('the backend was switched to ' + backend)
+    monkeypatch.setattr(matplotlib, 'use', use)
+    job = (plotMovEfficiency, dict(path=str(tmp_path / 'bars.pdf'), algos=['a'], values=np.array([0.2]),
+                                   errors=np.array([0.1]), color='red', ecolor='blue'))
+    assert renderCharts([job]) == [str(tmp_path / 'bars.pdf')]
+    assert matplotlib.rcParams['axes.titlesize'] != 13
+
+def test_renderCharts_reuses_unchanged_charts(tmp_path):
+    def job(name, value):
+        return (writeKcovLatex, dict(path=str(tmp_path / name), kcov='1-coverage', algos=['a'], commRanges=[10],
+                                     ratios=[0.5], means=np.full((1, 1, 1), value), stds=np.zeros((1, 1, 1))))
+    fingerprints = {}
+    assert len(renderCharts([job('x.txt', 0.5), job('y.txt', 0.5)], fingerprints=fingerprints)) == 2
+    assert renderCharts([job('x.txt', 0.5), job('y.txt', 0.5)], fingerprints=fingerprints) == []
+    assert renderCharts([job('x.txt', 0.5), job('y.txt', 0.25)], fingerprints=fingerprints) == [str(tmp_path / 'y.txt')]
+    (tmp_path / 'x.txt').unlink()
+    assert renderCharts([job('x.txt', 0.5), job('y.txt', 0.25)], fingerprints=fingerprints) == [str(tmp_path / 'x.txt')]
+
+def test_chartFingerprint_covers_the_helpers_of_the_drawing_function(monkeypatch):
+    assert [name for name, source in chartSources(plotKcovHeatmap)] == ['newFigure', 'noOdds', 'plotKcovHeatmap']
+    before = chartFingerprint(plotKcov3D, {'path': 'x.pdf'})
+    monkeypatch.setattr(charts, 'rasterDpi', 100)
+    assert chartFingerprint(plotKcov3D, {'path': 'x.pdf'}) != before
+
+def test_saveReductions_round_trip(tmp_path):
+    timeline = np.arange(4.0)
+    exports = [Export({'Seed': float(seed), 'Algorithm': 'a'}, ['x', 'y'], np.full((4, 2), seed + 1.0)) for seed in range(2)]
+    reductions = reduceDataset(spliceExports(None, exports, 'time', timeline), ['Seed'], 'time', {'ratio': ('x', 'y')})
+    saveReductions(reductions, str(tmp_path / 'reductions.nc'))
+    for expected, loaded in zip(reductions, loadReductions(str(tmp_path / 'reductions.nc'))):
+        xr.testing.assert_identical(expected, loaded)
+
+def test_readInTime_reads_a_window_at_the_coarsest_level_enough(tmp_path):
+    timeline = np.arange(40.0)
+    exports = [Export({'Seed': 0.0, 'Algorithm': algo}, ['x'], np.arange(40.0)[:, np.newaxis] * (i + 1)) for i, algo in enumerate('ab')]
+    reductions = reduceDataset(spliceExports(None, exports, 'time', timeline), ['Seed'], 'time')
+    path = str(tmp_path / 'reductions.nc')
+    saveReductions(reductions, path, 'time', levels=[10, 4])
+    xr.testing.assert_identical(readInTime(path), reductions.inTime.assign_attrs(levels=[4, 10]))
+    window = readInTime(path, start=5, stop=12, Algorithm='b')
+    assert window['time'].values.tolist() == list(range(5, 12)) and window['x'].values.tolist() == [2.0 * t for t in range(5, 12)]
+    coarse = readInTime(path, start=8, stop=24, samples=3)
+    assert coarse['time'].values.tolist() == [9.5, 13.5, 17.5, 21.5] and coarse['x'].sel(Algorithm='a').values.tolist() == [9.5, 13.5, 17.5, 21.5]
+    assert readInTime(path, start=8, stop=24, samples=1)['time'].values.tolist() == [14.5]
+    assert loadReductions(path, inTime=False).inTime.sizes == {}
+
+def test_generateExports_are_read_as_alchemist_exports(tmp_path):
+    grid = {'Algorithm': ['ff_linpro', 'nocomm'], 'CamObjRatio': [0.2], 'CommunicationRange': [10.0, 100.0]}
+    files = generateExports(str(tmp_path), 2, 30, step=2.0, jitter=0.5, grid=grid)
+    assert len(files) == 8 and files[0].endswith('simulations_Seed-0.0_Algorithm-ff_linpro_CamObjRatio-0.2_CommunicationRange-10.0.txt')
+    for path in files:
+        export = readExport(path)
+        assert export.coordinates == extractCoordinates(path)
+        assert export.names == extractVariableNames(path) == ['time', '3-coverage', '2-coverage', '1-coverage', 'CamDist', 'ObjDist']
+        np.testing.assert_array_equal(export.data, np.array(openCsv(path)))
+        assert export.data.shape == (30, 6) and np.all(np.diff(export.data[:, 0]) > 0)
+        assert np.all(export.data[1:, 1] <= export.data[1:, 2]) and np.all(export.data[1:, 2] <= export.data[1:, 3])
+
+def test_RunReport_records_stages_and_rates(tmp_path):
+    report = RunReport(['process.py'])
+    with report.stage('read', experiment='simulations') as record:
+        out = io.StringIO()
+        record['files'] = len(list(progress(range(3), 3, 'simulations', every=0, out=out)))
+        record['rows'] = 300
+    assert out.getvalue().splitlines()[-1].startswith('simulations: 3/3 files')
+    report.save(str(tmp_path / 'report.json'))
+    saved = json.loads((tmp_path / 'report.json').read_text())
+    assert saved['command'] == ['process.py'] and len(saved['stages']) == 1
+    stage = saved['stages'][0]
+    assert stage['stage'] == 'read' and stage['experiment'] == 'simulations'
+    assert stage['rowsPerSecond'] == pytest.approx(100 * stage['filesPerSecond'])
+    assert stage['wallSeconds'] >= 0 and stage['cpuSeconds'] >= 0
+
+def test_integrate_weights_values_by_time():
+    data = np.array([[0, 1, 1], [1, 2, float('nan')], [3, float('nan'), float('nan')], [4, 4, float('nan')]])
+    means, sums = integrate(0, data, 'step')
+    np.testing.assert_allclose(means[1:], [(1 * 1 + 2 * 2) / 3, 1])
+    np.testing.assert_array_equal(sums[1:], [7, 1])
+    means, sums = integrate(0, data, 'trapezoid')
+    np.testing.assert_allclose(means[1:], [1.5, 1]) # a value never followed by another one counts as it is
+    means, sums = integrate(0, data, 'step', window=(1, 3))
+    np.testing.assert_allclose(means[1:], [2, float('nan')])
+    np.testing.assert_array_equal(sums[1:], [2, float('nan')])
+    with pytest.raises(ValueError):
+        integrate(0, data, 'simpson')
+
+def test_summarizeExport_resamples_only_if_asked(tmp_path):
+    path = str(tmp_path / 'simulations_test.txt')
+    with open(path, 'w') as file:
+        file.write(exportText)
+    timeline = np.linspace(0, 4, 5)
+    summary = summarizeExport(path, 'time', 'step', window=(0, 4))
+    assert summary.names == ['3-coverage', '2-coverage', '1-coverage', 'CamDist', 'ObjDist'] and summary.data is None and summary.rows == 3
+    np.testing.assert_allclose(summary.means, [0.1, 0.25, 0.5, (0 * 2 + 12.5 * 2) / 4, (0 * 2 + 3 * 2) / 4])
+    np.testing.assert_allclose(summary.sums, [0.1, 0.75, 1.5, 12.501, 5.75])
+    timed = summarizeExport(path, 'time', 'step', timeline=timeline)
+    np.testing.assert_array_equal(timed.data, np.delete(resample(0, timeline, readExport(path).data), 0, axis=1))
+
+def test_Catalog_rescans_only_changed_files(tmp_path):
+    files = generateExports(str(tmp_path / 'data'), 1, 20, grid={'Algorithm': ['ff_linpro', 'nocomm'], 'CommunicationRange': [10.0, 100.0]})
+    assert scanExport(files[0])[1:] == (20, 0.0, 19.0)
+    with Catalog(str(tmp_path / 'catalog.sqlite')) as catalog:
+        entries = catalog.update('simulations', files)
+        # only the header and the tail are read, the rows are counted by the stages
+        assert [(entry.rows, entry.first, entry.last) for entry in entries] == [(None, 0.0, 19.0)] * 4
+        catalog.count({file: 20 for file in files})
+        selected = catalog.entries('simulations', Algorithm=['ff_linpro'], CommunicationRange=100.0)
+        assert [entry.coordinates for entry in selected] == [{'Seed': 0.0, 'Algorithm': 'ff_linpro', 'CommunicationRange': 100.0}]
+    generateExports(str(tmp_path / 'data'), 1, 30, grid={'Algorithm': ['nocomm'], 'CommunicationRange': [10.0]})
+    with Catalog(str(tmp_path / 'catalog.sqlite')) as catalog:
+        entries = catalog.update('simulations', files[1:])
+        assert [(entry.rows, entry.last) for entry in entries] == [(20, 19.0), (None, 29.0), (20, 19.0)]
+        assert len(catalog.entries('simulations')) == 3
+
+def test_Catalog_reads_compressed_exports_in_full_only_for_their_span(tmp_path):
+    files = generateExports(str(tmp_path), 1, 25, jitter=0.3, grid={'Algorithm': ['ff_linpro', 'nocomm']})
+    archive = str(tmp_path / 'results.tar.gz')
+    with tarfile.open(archive, 'w:gz') as tar:
+        for path in files:
+            tar.add(path, 'results/' + os.path.basename(path))
+    with open(files[0], 'rb') as source, gzip.open(files[0] + '.gz', 'wb') as target:
+        target.write(source.read())
+    with Catalog(str(tmp_path / 'catalog.sqlite')) as catalog:
+        compressed = [files[0] + '.gz'] + [archive + '::' + member for member in catalog.members(archive)]
+        entries = catalog.update('simulations', compressed)
+        assert [entry.rows for entry in entries] == [None] * 3 and all(np.isnan(entry.last) for entry in entries)
+        assert [entry.first for entry in entries] == [scanExport(files[0])[2]] + [scanExport(path)[2] for path in files]
+        entries = catalog.update('simulations', compressed, spans=True)
+        assert [entry[3:] for entry in entries] == [scanExport(files[0])[1:]] + [scanExport(path)[1:] for path in files]
+
+def test_Catalog_finds_the_span_of_compressed_exports_whose_rows_were_counted(tmp_path, monkeypatch):
+    path, = generateExports(str(tmp_path), 1, 30, grid={'Algorithm': ['ff_linpro']})
+    with open(path, 'rb') as source, gzip.open(path + '.gz', 'wb') as target:
+        target.write(source.read())
+    with Catalog(str(tmp_path / 'catalog.sqlite')) as catalog:
+        catalog.update('simulations', [path + '.gz'])
+        catalog.count({path + '.gz': 30})
+        entry, = catalog.update('simulations', [path + '.gz'], spans=True)
+        assert (entry.rows, entry.last) == (30, 29.0)
+    monkeypatch.setattr(cli, 'minTime', None)
+    with pytest.raises(ValueError):
+        cli.experimentTimeline([entry._replace(last=float('nan'))])
+
+def test_readExport_reads_compressed_files_and_archive_members(tmp_path):
+    files = generateExports(str(tmp_path), 1, 25, jitter=0.3, grid={'Algorithm': ['ff_linpro', 'nocomm', 'sm_av']})
+    archive = str(tmp_path / 'results.tar.xz')
+    with tarfile.open(archive, 'w:xz') as tar:
+        for path in files:
+            tar.add(path, 'results/' + os.path.basename(path))
+    members = archiveMembers(archive, 'simulations_*.txt')
+    assert members == ['results/' + os.path.basename(path) for path in files]
+    for path in files:
+        with open(path, 'rb') as source:
+            content = source.read()
+        with gzip.open(path + '.gz', 'wb') as target:
+            target.write(content)
+        with lzma.open(path + '.xz', 'wb') as target:
+            target.write(content)
+    # backwards, then forwards, to go through the archive again
+    for member, path in list(zip(members, files))[::-1] + list(zip(members, files)):
+        expected = readExport(path)
+        for other in (path + '.gz', path + '.xz', archive + '::' + member):
+            export = readExport(other)
+            assert export.coordinates == expected.coordinates and export.names == expected.names
+            np.testing.assert_array_equal(export.data, expected.data)
+
+def test_readExport_reads_an_archive_written_again_since_it_was_opened(tmp_path):
+    archive = str(tmp_path / 'results.tar')
+    for rows in (20, 30):
+        files = generateExports(str(tmp_path / str(rows)), 1, rows, grid={'Algorithm': ['ff_linpro', 'nocomm']})
+        with tarfile.open(archive, 'w') as tar:
+            for path in files:
+                tar.add(path, os.path.basename(path))
+        os.utime(archive, ns=(rows, rows))
+        assert len(readExport(archive + '::' + os.path.basename(files[0])).data) == rows
+    assert archive in archiveCursors
+    closeArchives()
+    assert not archiveCursors
+
+def test_convertExport_is_read_as_the_text(tmp_path):
+    path, = generateExports(str(tmp_path), 1, 40, jitter=0.3, grid={'Algorithm': ['ff_linpro']})
+    assert convertExport(path, str(tmp_path / 'store')) == 40
+    copy = columnarPath(str(tmp_path / 'store'), path)
+    export, expected = readExport(copy), readExport(path)
+    assert isinstance(export.data, np.memmap) and export.data.flags.f_contiguous
+    assert export.coordinates == expected.coordinates and export.names == expected.names
+    np.testing.assert_array_equal(export.data, expected.data)
+    timeline = np.linspace(0, 40, 100)
+    np.testing.assert_array_equal(ingestExport(copy, 'time', timeline).data, ingestExport(path, 'time', timeline).data)
+
+def test_ExportTail_reads_only_the_appended_lines(tmp_path):
+    path, = generateExports(str(tmp_path), 1, 50, jitter=0.3, grid={'Algorithm': ['ff_linpro']})
+    with open(path) as file:
+        content = file.read()
+    expected = readExport(path)
+    tail = ExportTail(str(tmp_path / 'running.txt'))
+    polled = []
+    # cut in the header, in the middle of lines and before the footer
+    for cut in (100, content.index('\n0.0 ') + 3, len(content) // 2, content.rindex('\n#') - 5, content.rindex('\n#') + 1, len(content)):
+        with open(tail.path, 'w') as file:
+            file.write(content[:cut])
+        polled.append(tail.poll())
+    assert polled[0] == 0 and sum(polled) == 50 and tail.ended
+    export = tail.export()
+    assert export.coordinates == expected.coordinates and export.names == expected.names
+    np.testing.assert_array_equal(export.data, expected.data)
+
+def test_PartialSummary_merges_to_the_same_bits_in_any_order(tmp_path):
+    grid = {'Algorithm': ['ff_linpro', 'nocomm'], 'CommunicationRange': [10.0, 100.0]}
+    timeline = np.linspace(0, 60, 50)
+    exports = ingestFiles(generateExports(str(tmp_path), 6, 60, jitter=0.3, grid=grid), 'time', timeline)
+    ratios = {'MovEfficiency': ('ObjDist', 'CamDist')}
+    def fold(exports):
+        summary = PartialSummary(['Seed'], 'time', timeline, ratios)
+        for export in exports:
+            summary.add(export)
+        return summary
+    whole = fold(exports).reductions()
+    savePartial(fold(exports[1::3]), str(tmp_path / 'a.partial'), experiment='simulations')
+    parts = [fold(exports[0::3]), loadPartial(str(tmp_path / 'a.partial'))[0], fold(exports[2::3])]
+    for order in ([0, 1, 2], [2, 0, 1], [1, 2, 0]):
+        merged = fold([])
+        for i in order:
+            merged.merge(parts[i])
+        for field, expected in zip(merged.reductions(), whole):
+            xr.testing.assert_identical(field, expected)
+    streaming = StreamingSummary(['Seed'], 'time', timeline, ratios)
+    for export in exports:
+        streaming.add(export)
+    for field, expected in zip(whole, streaming.reductions()):
+        xr.testing.assert_allclose(field, expected, rtol=1e-12)
+    with pytest.raises(ValueError):
+        parts[0].merge(parts[0])
+
+def test_seedConvergence_shrinks_the_intervals_as_seeds_accumulate():
+    rng = np.random.default_rng(0)
+    values = rng.normal(0.5, [[0.001], [0.1]], (2, 40))
+    dataMean = xr.Dataset({'1-coverage': (['Algorithm', 'Seed'], values)}, coords={'Algorithm': ['ff_linpro', 'nocomm'], 'Seed': np.arange(40.0)})
+    widths = seedConvergence(dataMean, ['Seed'])
+    assert widths['1-coverage'].dims == ('seeds', 'Algorithm') and np.isnan(widths['1-coverage'][0]).all()
+    # 2.776 is the 97.5% quantile of t with 4 degrees of freedom
+    np.testing.assert_allclose(widths['1-coverage'].sel(seeds=5), 2.776 * values[:, :5].std(axis=1, ddof=1) / np.sqrt(5), rtol=1e-3)
+    needed = minimumSeeds(widths, 0.01)['1-coverage']
+    assert needed.sel(Algorithm='ff_linpro') == 2 and np.isnan(needed.sel(Algorithm='nocomm'))
+    needed = minimumSeeds(widths, 0.2, dataMean.mean('Seed'))['1-coverage'].sel(Algorithm='nocomm')
+    assert (widths['1-coverage'].sel(Algorithm='nocomm', seeds=slice(int(needed), None)) <= 0.2 * 0.5 * 1.05).all()
+    assert widths['1-coverage'].sel(Algorithm='nocomm', seeds=int(needed) - 1) > 0.2 * abs(values[1].mean())
+
+def test_getSurfData_flattens_the_grid_by_rows():
+    values = np.arange(6.0).reshape(2, 3)
+    x, y, z = getSurfData(values, [10.0, 25.0], [0.2, 0.4, 0.6])
+    assert x.tolist() == [10.0] * 3 + [25.0] * 3 and y.tolist() == [0.2, 0.4, 0.6] * 2 and z.tolist() == list(range(6))
+
+def test_convert_stage_writes_the_columnar_copies(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    files = generateExports('data', 1, 30, jitter=0.3, grid={'Algorithm': ['ff_linpro', 'nocomm']})
+    cli.main(['convert'])
+    for file in files:
+        np.testing.assert_array_equal(readExport(columnarPath(cli.storeDir, file)).data, readExport(file).data)
+
+def test_studentQuantile_matches_the_tables_at_any_confidence():
+    tables = {(0.975, 1): 12.706205, (0.975, 2): 4.302653, (0.975, 3): 3.182446, (0.995, 3): 5.840909, (0.9995, 3): 12.923979,
+              (0.995, 4): 4.604095, (0.995, 10): 3.169273, (0.975, 30): 2.042272}
+    for (p, df), expected in tables.items():
+        assert float(studentQuantile(p, df)) == pytest.approx(expected, rel=1e-6)
+    assert np.isnan(studentQuantile(0.975, [0.0])).all()
+
+def test_syntheticData_accepts_integer_steps():
+    times = syntheticData(50, step=7, jitter=1, rng=np.random.default_rng(0))[:, 0]
+    assert times.dtype == float and (np.diff(times) > 0).all() and times[0] == 0
+
+def test_seeds_stage_analyses_only_the_coverages_by_default(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    generateExports('data', 4, 30, jitter=0.3, grid={'Algorithm': ['ff_linpro', 'nocomm']})
+    monkeypatch.setattr(cli, 'maxTime', 29)
+    monkeypatch.setattr(cli, 'timeSamples', 30)
+    cli.main(['ingest'])
+    capsys.readouterr()
+    cli.main(['seeds', '--precision', '100'])
+    with xr.open_dataset('data_summary_simulations_seeds.nc', group='minimumSeeds') as needed:
+        assert sorted(needed.data_vars) == cli.seedsVariables
+    assert '4 of 8 simulations were enough' in capsys.readouterr().out